@@ -0,0 +1,136 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Storage cost of the rig parameters, old flat layout against the nested
+    per rig type groups.
+
+    blender -b --factory-startup --python benchmarks/benchmark_parameters.py -- \
+        [--bones 5000] [--output parameters_result.json]
+
+    A metarig of --bones bones is given rig types round robin, and every
+    number parameter of its rig type is written the way older versions
+    stored them, flat in pose_bone.gamerig. The file is saved uncompressed,
+    migrated with the Migrate operator and saved again. The saved sizes and
+    the ID property counts of both layouts are reported.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gamerig
+from gamerig.utils import legacy_parameter_keys
+
+NUMBER_TYPES = ('BOOLEAN', 'INT', 'FLOAT')
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description="GameRig rig parameter storage benchmark")
+    parser.add_argument('--bones', type=int, default=5000, help="bones of the metarig")
+    parser.add_argument('--output', default='parameters_result.json', help="result JSON path")
+    return parser.parse_args(argv)
+
+
+def reset_scene():
+    for data in (bpy.data.objects, bpy.data.armatures, bpy.data.meshes, bpy.data.actions, bpy.data.collections):
+        for i in list(data):
+            data.remove(i)
+
+
+def default_values(group):
+    """ {parameter: default} of the number parameters of a rig type parameter group.
+    """
+    values = {}
+    for prop in group.bl_rna.properties:
+        if prop.identifier in ('rna_type', 'name') or prop.type not in NUMBER_TYPES:
+            continue
+        values[prop.identifier] = list(prop.default_array) if getattr(prop, 'is_array', False) else prop.default
+    return values
+
+
+def create_flat_metarig(count):
+    bpy.ops.object.armature_add()
+    obj = bpy.context.active_object
+    obj.name = "metarig"
+    bpy.ops.object.mode_set(mode='EDIT')
+    bones = obj.data.edit_bones
+    bones.remove(bones[0])
+    for i in range(count):
+        bone = bones.new('bone.%05d' % i)
+        bone.head = (i * 0.01, 0.0, 0.0)
+        bone.tail = (i * 0.01, 0.0, 0.1)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    types = sorted(gamerig.RIG_PARAMETER_GROUPS.items())
+    defaults = { rig_type : default_values(group) for rig_type, group in types }
+    for i, pb in enumerate(obj.pose.bones):
+        rig_type = types[i % len(types)][0]
+        pb.gamerig.name = rig_type
+        for key, value in defaults[rig_type].items():
+            pb.gamerig[key] = value
+    return obj
+
+
+def id_property_count(obj):
+    count = 0
+    for pb in obj.pose.bones:
+        for key in pb.gamerig.keys():
+            value = pb.gamerig[key]
+            count += 1 + (len(value.keys()) if hasattr(value, 'keys') else 0)
+    return count
+
+
+def saved_size(directory, name):
+    path = os.path.join(directory, name + '.blend')
+    bpy.ops.wm.save_as_mainfile(filepath=path, compress=False, copy=True)
+    return os.path.getsize(path)
+
+
+def main():
+    args = parse_args()
+    gamerig.register()
+    reset_scene()
+    obj = create_flat_metarig(args.bones)
+    result = { 'bones' : args.bones }
+    with tempfile.TemporaryDirectory() as directory:
+        result['flat'] = { 'file_size' : saved_size(directory, 'flat'), 'id_properties' : id_property_count(obj) }
+        bpy.context.view_layer.objects.active = obj
+        bpy.ops.gamerig.migrate_armature()
+        left = sum(len(legacy_parameter_keys(pb)) for pb in obj.pose.bones)
+        result['nested'] = {
+            'file_size' : saved_size(directory, 'nested'), 'id_properties' : id_property_count(obj), 'not_migrated' : left,
+        }
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    for layout in ('flat', 'nested'):
+        print("%-7s %10d bytes %8d ID properties" % (layout, result[layout]['file_size'], result[layout]['id_properties']))
+    sys.exit(1 if left else 0)
+
+
+if __name__ == '__main__':
+    main()
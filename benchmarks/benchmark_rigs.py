@@ -0,0 +1,269 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Evaluation benchmark of the rigs generated from the bundled metarigs.
+
+    blender -b --factory-startup --python benchmarks/benchmark_rigs.py -- \
+        [--frames 120] [--output result.json] [--baseline benchmarks/baseline.json] \
+        [--update-baseline] [--tolerance 0.1] [--optimize] [--metarigs human cat ...] \
+        [--tentacle-segments 24] [--check-rotation]
+
+    Each metarig is added to an empty scene and generated. A synthetic
+    animation is keyed on every control and the depsgraph evaluation time
+    per frame is measured in FK, IK and Rig/Phy modes. Results are written as
+    JSON and compared against the baseline. The exit code is 1 if any mode
+    got slower than the tolerance allows.
+
+    --optimize generates with the rig optimizer enabled; comparing such a run
+    against a baseline recorded without it gives the evaluation time saved.
+
+    A synthetic tentacle of --tentacle-segments bones is also generated with
+    the IK chain ('tentacle_chain') and the Spline IK ('tentacle_spline')
+    modes, to compare their constraint counts and evaluation times.
+
+    --check-rotation also generates each metarig rotated by 90 degrees around
+    Z and checks that the world space rest pose of the rig rotated the same
+    way ('rotation_error', fails above ROTATION_TOLERANCE).
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import bpy
+from mathutils import Matrix
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gamerig
+from gamerig import generate, optimizer, profiling
+from gamerig.utils import get_metarig_module, get_rig_name, METARIG_DIR
+
+METARIGS = {
+    'human'             : ('human', METARIG_DIR),
+    'human_simple_face' : ('human_simple_face', METARIG_DIR),
+    'cat'               : ('cat', METARIG_DIR),
+    'mannequin'         : ('Mannequin', METARIG_DIR + '.Unreal Engine'),
+    'ue5_mannequin'     : ('ue5_mannequin', METARIG_DIR + '.Unreal Engine'),
+    'mechanim_human'    : ('human', METARIG_DIR + '.Unity Mechanim'),
+    'roblox_r15'        : ('R15', METARIG_DIR + '.Roblox'),
+}
+
+
+ROTATION_TOLERANCE = 1e-4
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description="GameRig rig evaluation benchmark")
+    parser.add_argument('--frames', type=int, default=120, help="frames to evaluate per mode")
+    parser.add_argument('--output', default='benchmark_result.json', help="result JSON path")
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed slowdown ratio against the baseline")
+    parser.add_argument('--optimize', action='store_true', help="generate with the rig optimizer enabled")
+    parser.add_argument('--metarigs', nargs='*', default=list(METARIGS.keys()), choices=list(METARIGS.keys()))
+    parser.add_argument('--check-rotation', action='store_true', help="check the rigs generated from rotated metarigs")
+    parser.add_argument('--tentacle-segments', type=int, default=24, help="bones of the synthetic tentacle, 0 to skip it")
+    return parser.parse_args(argv)
+
+
+def reset_scene():
+    for data in (bpy.data.objects, bpy.data.armatures, bpy.data.meshes, bpy.data.actions, bpy.data.collections):
+        for i in list(data):
+            data.remove(i)
+
+
+def create_metarig(name, path):
+    module = get_metarig_module(name, path)
+    bpy.ops.object.armature_add()
+    obj = bpy.context.active_object
+    obj.name = "metarig"
+    obj.data.name = "metarig"
+    bpy.ops.object.mode_set(mode='EDIT')
+    bones = obj.data.edit_bones
+    bones.remove(bones[0])
+    module.create(obj)
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return obj
+
+
+def create_tentacle_metarig(segments, use_spline_ik):
+    bpy.ops.object.armature_add()
+    obj = bpy.context.active_object
+    obj.name = "metarig"
+    obj.data.name = "metarig"
+    bpy.ops.object.mode_set(mode='EDIT')
+    bones = obj.data.edit_bones
+    bones.remove(bones[0])
+    parent = None
+    for i in range(segments):
+        bone = bones.new('tentacle.%03d' % i)
+        bone.head = (0.0, 0.0, i * 0.1)
+        bone.tail = (0.0, 0.0, (i + 1) * 0.1)
+        bone.parent = parent
+        bone.use_connect = parent is not None
+        parent = bone
+    bpy.ops.object.mode_set(mode='OBJECT')
+    pbone = obj.pose.bones['tentacle.000']
+    pbone.gamerig.name = 'tentacle'
+    pbone.gamerig.params.chain_length = segments
+    pbone.gamerig.params.stretchable = True
+    pbone.gamerig.params.use_spline_ik = use_spline_ik
+    return obj
+
+
+def world_rest_pose(metarig, angle):
+    """ {bone: world space rest matrix} of the rig generated from metarig rotated by angle around Z, or None on error.
+    """
+    metarig.rotation_mode = 'XYZ'
+    metarig.rotation_euler = (0.0, 0.0, angle)
+    bpy.context.view_layer.update()
+    if generate.generate_rig(bpy.context, metarig):
+        return None
+    rig = bpy.data.objects[get_rig_name(metarig)]
+    bpy.context.view_layer.update()
+    return { b.name : rig.matrix_world @ b.matrix_local for b in rig.data.bones }
+
+
+def rotation_error(key):
+    """ Largest difference between the rest pose of the rig generated from a
+        rotated metarig and the rotated rest pose of the unrotated one.
+    """
+    name, path = METARIGS[key]
+    poses = []
+    for angle in (0.0, math.pi / 2):
+        reset_scene()
+        poses.append(world_rest_pose(create_metarig(name, path), angle))
+        if poses[-1] is None:
+            return None
+    rotation = Matrix.Rotation(math.pi / 2, 4, 'Z')
+    return max(
+        abs(x)
+        for bone, matrix in poses[0].items()
+        for row in (rotation @ matrix - poses[1][bone])
+        for x in row
+    )
+
+
+def benchmark(key, frames, optimize=False):
+    name, path = METARIGS[key]
+    reset_scene()
+    metarig = create_metarig(name, path)
+    return measure_metarig(metarig, frames, optimize)
+
+
+def benchmark_tentacle(segments, use_spline_ik, frames, optimize=False):
+    reset_scene()
+    metarig = create_tentacle_metarig(segments, use_spline_ik)
+    return measure_metarig(metarig, frames, optimize)
+
+
+def measure_metarig(metarig, frames, optimize=False):
+    metarig.data.gamerig.optimize = optimize
+
+    start = time.perf_counter()
+    error = generate.generate_rig(bpy.context, metarig)
+    generation_time = time.perf_counter() - start
+    if error:
+        return { 'error' : error }
+
+    rig = bpy.data.objects[get_rig_name(metarig)]
+    metarig.hide_set(True)
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = frames
+    profiling.add_synthetic_animation(rig, 1, frames)
+
+    result = {
+        'generation' : generation_time * 1000.0,
+        'bones'      : len(rig.pose.bones),
+        'constraints': sum(len(pb.constraints) for pb in rig.pose.bones),
+        'drivers'    : len(rig.animation_data.drivers) if rig.animation_data else 0,
+        'folded_modifiers' : sum(generate.folded_modifiers.values()),
+    }
+    if optimize:
+        result['optimizer'] = dict(optimizer.stats)
+    for mode, switches in profiling.MODES.items():
+        result[mode] = profiling.measure(bpy.context, rig, 1, frames, switches)
+    return result
+
+
+def main():
+    args = parse_args()
+    gamerig.register()
+    results = {}
+    for key in args.metarigs:
+        print("GameRig benchmark: %s" % key)
+        results[key] = benchmark(key, args.frames, args.optimize)
+        if args.check_rotation and 'error' not in results[key]:
+            results[key]['rotation_error'] = rotation_error(key)
+    if args.tentacle_segments > 0:
+        for key, use_spline_ik in (('tentacle_chain', False), ('tentacle_spline', True)):
+            print("GameRig benchmark: %s" % key)
+            results[key] = benchmark_tentacle(args.tentacle_segments, use_spline_ik, args.frames, args.optimize)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    comparison = profiling.compare(results, baseline, args.tolerance)
+
+    report = {
+        'blender'    : bpy.app.version_string,
+        'gamerig'    : list(gamerig.bl_info['version']),
+        'frames'     : args.frames,
+        'optimize'   : args.optimize,
+        'tentacle_segments' : args.tentacle_segments,
+        'results'    : results,
+        'comparison' : comparison,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    regressed = False
+    for key, modes in comparison.items():
+        for mode, c in modes.items():
+            print("%-18s %-4s %8.3f ms -> %8.3f ms (x%.2f)%s" % (
+                key, mode, c['baseline'], c['current'], c['ratio'], ' REGRESSED' if c['regressed'] else ''
+            ))
+            regressed = regressed or c['regressed']
+
+    for key, result in results.items():
+        if 'error' in result:
+            print("%-18s generation failed: %s" % (key, result['error']))
+            regressed = True
+        error = result.get('rotation_error', 0.0)
+        if error is None or error > ROTATION_TOLERANCE:
+            print("%-18s rotated metarig generates a different rig (error %s)" % (key, error))
+            regressed = True
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
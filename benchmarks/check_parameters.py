@@ -0,0 +1,105 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Regression check of the old format rig parameter detection.
+
+    blender -b --factory-startup --python benchmarks/check_parameters.py
+
+    Every metarig bone gets a rig type and its LOD settings stored, then
+    a flat old format parameter on half of the bones. legacy_parameter_keys
+    must report exactly the flat parameters, and Migrate must move them
+    while leaving the LOD settings where they are. The exit code is 1 if
+    any check failed.
+"""
+
+import os
+import sys
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gamerig
+from gamerig.utils import legacy_parameter_keys, rig_parameter_group_name
+
+RIG_TYPE = 'generic'
+LEGACY_KEY = 'gamerig_check_parameter'
+BONES = 8
+
+
+def create_metarig():
+    bpy.ops.object.armature_add()
+    obj = bpy.context.active_object
+    obj.name = "metarig"
+    bpy.ops.object.mode_set(mode='EDIT')
+    bones = obj.data.edit_bones
+    bones.remove(bones[0])
+    for i in range(BONES):
+        bone = bones.new('bone.%03d' % i)
+        bone.head = (i * 0.1, 0.0, 0.0)
+        bone.tail = (i * 0.1, 0.0, 0.1)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    for i, pbone in enumerate(obj.pose.bones):
+        pbone.gamerig.name = RIG_TYPE
+        pbone.gamerig.lod_remove_from = 2
+        pbone.gamerig.lod_keep_every = 3
+        if i % 2:
+            pbone.gamerig[LEGACY_KEY] = 1.0
+    return obj
+
+
+def check(obj):
+    """ Returns the list of failures.
+    """
+    failures = []
+    for i, pbone in enumerate(obj.pose.bones):
+        expected = [LEGACY_KEY] if i % 2 else []
+        if legacy_parameter_keys(pbone) != expected:
+            failures.append("%s: old parameters %r, expected %r" % (pbone.name, legacy_parameter_keys(pbone), expected))
+
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.gamerig.migrate_armature()
+
+    for pbone in obj.pose.bones:
+        if legacy_parameter_keys(pbone):
+            failures.append("%s: not migrated %r" % (pbone.name, legacy_parameter_keys(pbone)))
+        if (pbone.gamerig.lod_remove_from, pbone.gamerig.lod_keep_every) != (2, 3):
+            failures.append("%s: LOD settings changed by Migrate" % pbone.name)
+        group = pbone.gamerig.get(rig_parameter_group_name(RIG_TYPE))
+        if group is not None and ('lod_remove_from' in group or 'lod_keep_every' in group):
+            failures.append("%s: LOD settings moved into the rig parameters" % pbone.name)
+    return failures
+
+
+def main():
+    gamerig.register()
+    for data in (bpy.data.objects, bpy.data.armatures):
+        for i in list(data):
+            data.remove(i)
+    failures = check(create_metarig())
+    for failure in failures:
+        print("FAILED " + failure)
+    print("%d failure(s)" % len(failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,13 +35,22 @@ bl_info = {
 if "bpy" in locals():
     import importlib
     importlib.reload(utils)
+    importlib.reload(analysis)
+    importlib.reload(optimizer)
+    importlib.reload(profiling)
+    importlib.reload(pose_cache)
+    importlib.reload(export)
+    importlib.reload(lod)
+    importlib.reload(weights)
+    importlib.reload(animation)
     importlib.reload(rig_lists)
     importlib.reload(generate)
+    importlib.reload(live_preview)
     importlib.reload(ui)
     importlib.reload(metarig_menu)
     importlib.reload(sample_menu)
 else:
-    from . import utils, rig_lists, generate, ui, metarig_menu, sample_menu
+    from . import utils, analysis, optimizer, profiling, pose_cache, export, lod, weights, animation, rig_lists, generate, live_preview, ui, metarig_menu, sample_menu
 
 import bpy
 from bpy.types import (
@@ -156,6 +165,21 @@ class ArmatureProperties(PropertyGroup):
         name="GameRig Rig Name",
         description="Defines the name of the Rig."
     ) # type: ignore
+    live_preview : BoolProperty(
+        name="Live Preview",
+        description="Regenerate the rig automatically shortly after rig parameters or metabones are edited",
+        default=False
+    ) # type: ignore
+    optimize : BoolProperty(
+        name="Optimize Rig",
+        description="Remove constraints and helper bones which do nothing at runtime after generation",
+        default=False
+    ) # type: ignore
+    lod_count : IntProperty(
+        name="LOD Levels",
+        description="Number of reduced deform armatures (name_LOD1, ...) generated along with the rig",
+        default=0, min=0, max=8
+    ) # type: ignore
 
     colors : CollectionProperty(type=ColorSet) # type: ignore
     selection_colors : PointerProperty(type=SelectionColors) # type: ignore
@@ -197,6 +221,27 @@ class ArmatureProperties(PropertyGroup):
 
 
 class PoseBoneProperties(PropertyGroup):
+    lod_remove_from : IntProperty(
+        name="Remove at LOD",
+        description="The deform bones of this rig are removed from this LOD level on (0 : never removed)",
+        default=0, min=0, max=8
+    ) # type: ignore
+    lod_keep_every : IntProperty(
+        name="Keep Every",
+        description="In LOD armatures, keep every n-th deform bone of this rig and merge the others into them",
+        default=1, min=1, max=8
+    ) # type: ignore
+
+    @property
+    def params(self):
+        """ Parameter group of the rig type selected by name, or None.
+            Each rig type has its own nested group, so only bones which
+            actually use a rig type carry its parameters.
+        """
+        rig_type = (self.name or '').replace(' ', '')
+        if rig_type in RIG_PARAMETER_GROUPS:
+            return getattr(self, utils.rig_parameter_group_name(rig_type))
+        return None
 
     @classmethod
     def register(cls):
@@ -220,31 +265,39 @@ def update_callback(prop_name):
                 in_update = True
                 bone = context.active_pose_bone
 
-                if bone and bone.gamerig == params:
+                if bone and bone.gamerig.params == params:
                     rig_type = (bone.gamerig.name or '').replace(' ', '')
                     if rig_type:
-                        rig_module = utils.get_rig_type(rig_type)
+                        rig_module = utils.find_rig_type(rig_type)
                         rig_cls = getattr(rig_module, 'Rig', None)
                         if rig_cls:
                             rig_cb = getattr(rig_cls, 'on_parameter_update', None)
                             if rig_cb:
                                 rig_cb(context, bone, params, prop_name)
+                    live_preview.mark_dirty(bone.id_data, bone.name)
             finally:
                 in_update = False
 
     return callback
 
-# Remember the initial property set
-PARAMETERS_BASE_DIR = set(dir(PoseBoneProperties))
+# Per rig type parameter groups {rig type: PropertyGroup class}
+RIG_PARAMETER_GROUPS = {}
 
-PARAMETER_TABLE = {'name': ('DEFAULT', StringProperty())}
+def add_parameters(rig_type, rig_module):
+    """ Define the parameter group of a rig type and hook it to PoseBoneProperties.
+    """
+    group_name = utils.rig_parameter_group_name(rig_type)
+    group = type('GameRigParameters_' + group_name, (PropertyGroup,), {})
+    bpy.utils.register_class(group)
+    rig_module.add_parameters(ParameterValidator(group, rig_type, {'name': ('DEFAULT', StringProperty())}))
+    setattr(PoseBoneProperties, group_name, PointerProperty(type=group, name='GameRig %s Parameters' % rig_type))
+    RIG_PARAMETER_GROUPS[rig_type] = group
 
 def clear_parameters():
-    for name in list(dir(PoseBoneProperties)):
-        if name not in PARAMETERS_BASE_DIR:
-            delattr(PoseBoneProperties, name)
-            if name in PARAMETER_TABLE:
-                del PARAMETER_TABLE[name]
+    for rig_type, group in RIG_PARAMETER_GROUPS.items():
+        delattr(PoseBoneProperties, utils.rig_parameter_group_name(rig_type))
+        bpy.utils.unregister_class(group)
+    RIG_PARAMETER_GROUPS.clear()
 
 
 def format_property_spec(spec):
@@ -316,10 +369,12 @@ class GlobalProperties(PropertyGroup):
         items=rig_lists.col_enum_list,
         default="All",
         name="GameRig Active Category",
-        description="The selected rig category"
+        description="The selected rig category",
+        update=lambda self, context: ui.update_rig_types(self, context)
     ) # type: ignore
 
     types : CollectionProperty(type=PropertyGroup) # type: ignore
+    types_category : StringProperty(description="The category types was built for") # type: ignore
     active_type : IntProperty(name="GameRig Active Rig", description="The selected rig type") # type: ignore
 
     show_bone_collection_pane : BoolProperty(default=False) # type: ignore
@@ -363,6 +418,8 @@ class GlobalProperties(PropertyGroup):
 
         # Sub-modules.
         ui.register()
+        live_preview.register()
+        pose_cache.register()
         metarig_menu.register()
         sample_menu.register()
 
@@ -370,7 +427,7 @@ class GlobalProperties(PropertyGroup):
         for rig in rig_lists.rig_list:
             r = utils.get_rig_type(rig)
             if hasattr(r, 'add_parameters'):
-                r.add_parameters(ParameterValidator(PoseBoneProperties, rig, PARAMETER_TABLE))
+                add_parameters(rig, r)
     
     @classmethod
     def unregister(cls):
@@ -379,6 +436,8 @@ class GlobalProperties(PropertyGroup):
         # Sub-modules.
         sample_menu.unregister()
         metarig_menu.unregister()
+        pose_cache.unregister()
+        live_preview.unregister()
         ui.unregister()
 
         del bpy.types.WindowManager.gamerig
@@ -0,0 +1,183 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+import re
+
+POSE_BONE_PATH = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\](.*)$')
+
+# Driver variable types which read a bone transform
+TRANSFORM_VARIABLE_TYPES = {'TRANSFORMS', 'ROTATION_DIFF', 'LOC_DIFF'}
+
+
+def parse_bone_path(data_path):
+    """ Returns (bone name, rest of the path) for a 'pose.bones["name"]...' path, or (None, None).
+    """
+    m = POSE_BONE_PATH.match(data_path or '')
+    if m:
+        return m.group(1).replace('\\"', '"'), m.group(2)
+    return None, None
+
+
+def constraint_targets(obj, con):
+    """ Bone names of obj a constraint reads.
+    """
+    targets = []
+    if hasattr(con, 'targets'):  # ARMATURE constraint
+        for t in con.targets:
+            if t.target == obj and t.subtarget:
+                targets.append(t.subtarget)
+    if getattr(con, 'target', None) == obj and getattr(con, 'subtarget', ''):
+        targets.append(con.subtarget)
+    if getattr(con, 'pole_target', None) == obj and getattr(con, 'pole_subtarget', ''):
+        targets.append(con.pole_subtarget)
+    return targets
+
+
+def dependency_graph(obj):
+    """ Bone level dependency graph of an armature object.
+        Returns {bone: {dependency bone: [reasons]}}. A bone depends on its
+        parent, on the bones its constraints target and on the bones whose
+        transforms its drivers read. IK chains depend on their IK targets.
+    """
+    graph = { pb.name : {} for pb in obj.pose.bones }
+
+    def add(owner, dependency, reason):
+        if owner in graph and dependency in graph:
+            graph[owner].setdefault(dependency, []).append(reason)
+
+    for pb in obj.pose.bones:
+        if pb.parent:
+            add(pb.name, pb.parent.name, 'parent')
+        for con in pb.constraints:
+            if con.mute:
+                continue
+            reason = 'constraint "%s"' % con.name
+            for target in constraint_targets(obj, con):
+                add(pb.name, target, reason)
+                if con.type in {'IK', 'SPLINE_IK'}:
+                    # The whole chain is solved towards the target
+                    chain = pb.parent_recursive
+                    if con.chain_count > 0:
+                        chain = chain[:con.chain_count - 1]
+                    for bone in chain:
+                        add(bone.name, target, reason + ' of "%s"' % pb.name)
+
+    if obj.animation_data:
+        for fcurve in obj.animation_data.drivers:
+            if fcurve.mute:
+                continue
+            owner, _ = parse_bone_path(fcurve.data_path)
+            if owner is None:
+                continue
+            reason = 'driver "%s"' % fcurve.data_path
+            for var in fcurve.driver.variables:
+                for t in var.targets:
+                    if t.id != obj:
+                        continue
+                    if var.type in TRANSFORM_VARIABLE_TYPES:
+                        add(owner, t.bone_target, reason)
+                    else:
+                        bone, rest = parse_bone_path(t.data_path)
+                        # Custom properties are not part of the bone evaluation
+                        if bone is not None and not rest.startswith('["'):
+                            add(owner, bone, reason)
+
+    return graph
+
+
+def strongly_connected_components(graph):
+    """ Tarjan's algorithm, iterative so that long bone chains don't hit the recursion limit.
+        Returns the list of components (lists of nodes).
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph[child])))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        n = stack.pop()
+                        on_stack.discard(n)
+                        component.append(n)
+                        if n == node:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def find_cycles(obj, graph=None):
+    """ Returns the dependency cycles of an armature as lists of bone names.
+    """
+    graph = graph or dependency_graph(obj)
+    return [
+        sorted(c) for c in strongly_connected_components(graph)
+        if len(c) > 1 or c[0] in graph[c[0]]
+    ]
+
+
+def describe_cycles(obj, bone_owners=None):
+    """ Human readable report lines for the dependency cycles of obj.
+        bone_owners : {bone: rig module name} to name the rigs involved.
+    """
+    graph = dependency_graph(obj)
+    lines = []
+    for cycle in find_cycles(obj, graph):
+        members = set(cycle)
+        links = []
+        for bone in cycle:
+            for dependency, reasons in graph[bone].items():
+                if dependency in members:
+                    links.append('%s -> %s (%s)' % (bone, dependency, ', '.join(reasons)))
+        line = "Dependency cycle between bones %s: %s" % (', '.join(cycle), '; '.join(links))
+        if bone_owners:
+            rigs = sorted({bone_owners[b] for b in cycle if b in bone_owners})
+            if rigs:
+                line += " [rigs: %s]" % ', '.join(rigs)
+        lines.append(line)
+    return lines
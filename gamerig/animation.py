@@ -0,0 +1,553 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Animation tools for generated rigs.
+"""
+
+import bpy
+import math
+import numpy as np
+from mathutils import Matrix, Vector
+
+from .utils import is_ctrl
+from . import pose_cache
+
+AXIS_INDEX = { 'X' : 0, 'Y' : 1, 'Z' : 2 }
+
+
+#=============================================
+# Keyframe writing
+#=============================================
+
+def replace_fcurve(action, data_path, index, group, frames, values):
+    """ Replace the keys of an F-Curve by (frames, values), written in bulk.
+    """
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    fcurve.keyframe_points.add(len(frames))
+    co = np.empty(len(frames) * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    fcurve.keyframe_points.foreach_set('co', co)
+    fcurve.update()
+    return fcurve
+
+
+def write_bone_matrices(action, pb, frames, matrices):
+    """ Key the pose channels of pb giving the basis matrices on frames.
+    """
+    locations, rotations, scales = [], [], []
+    for m in matrices:
+        loc, rot, scale = m.decompose()
+        if pb.rotation_mode == 'QUATERNION':
+            if rotations:
+                rot.make_compatible(rotations[-1])
+        elif pb.rotation_mode == 'AXIS_ANGLE':
+            axis, angle = rot.to_axis_angle()
+            rot = (angle, axis.x, axis.y, axis.z)
+        else:
+            rot = rot.to_euler(pb.rotation_mode, rotations[-1] if rotations else None)
+        locations.append(tuple(loc))
+        rotations.append(rot)
+        scales.append(tuple(scale))
+
+    rotation_path = {
+        'QUATERNION' : 'rotation_quaternion', 'AXIS_ANGLE' : 'rotation_axis_angle'
+    }.get(pb.rotation_mode, 'rotation_euler')
+    prefix = 'pose.bones["%s"].' % pb.name
+    for prop, values in (('location', locations), (rotation_path, [tuple(r) for r in rotations]), ('scale', scales)):
+        columns = np.array(values, dtype=np.float32).reshape(len(frames), -1)
+        for i in range(columns.shape[1]):
+            replace_fcurve(action, prefix + prop, i, pb.name, frames, columns[:, i])
+
+
+#=============================================
+# Root motion
+#=============================================
+
+def find_root_control(rig):
+    """ The top level control bone (c.root), or None.
+    """
+    for bone in rig.data.bones:
+        if bone.parent is None and is_ctrl(bone.name):
+            return bone.name
+    return None
+
+
+def root_children_controls(rig, root):
+    """ Control bones whose nearest control ancestor is root (torso, IK feet/hands, ...).
+    """
+    controls = []
+    for bone in rig.data.bones:
+        if not is_ctrl(bone.name) or bone.name == root:
+            continue
+        parent = bone.parent
+        while parent and not is_ctrl(parent.name):
+            parent = parent.parent
+        if parent and parent.name == root:
+            controls.append(bone.name)
+    return controls
+
+
+def smooth(values, window):
+    """ Centered moving average along the first axis, edges padded.
+    """
+    if window <= 1 or len(values) < 2:
+        return values
+    half = window // 2
+    padded = np.concatenate([np.repeat(values[:1], half, axis=0), values, np.repeat(values[-1:], half, axis=0)])
+    kernel = np.ones(window) / window
+    if values.ndim == 1:
+        return np.convolve(padded, kernel, mode='valid')[:len(values)]
+    return np.stack([np.convolve(padded[:, i], kernel, mode='valid')[:len(values)] for i in range(values.shape[1])], axis=1)
+
+
+def extract_root_motion(context, rig, action, root, pivot, up_axis='Z', location_axes={'X', 'Y'},
+                        use_rotation=True, forward_axis='Z', smoothing=1):
+    """ Move the ground projection of the pivot (hips/torso) motion of action
+        onto the root control, and compensate the controls parented to the
+        root so that the character pose doesn't change.
+        The action is sampled once through the pose cache, then every channel is written in bulk.
+        Returns the number of frames.
+    """
+    start, end = (int(round(f)) for f in action.frame_range)
+    frames = list(range(start, end + 1))
+    controls = root_children_controls(rig, root)
+    pb = rig.pose.bones
+
+    # Sampling pass, shared with the other tools through the pose cache
+    bones, matrices, bases = pose_cache.sample(context, rig, action, frames)
+    index = { n : i for i, n in enumerate(bones) }
+    root_old = [Matrix(m.tolist()) for m in matrices[:, index[root]]]
+    pivot_matrices = [Matrix(m.tolist()) for m in matrices[:, index[pivot]]]
+    samples = {
+        n : [(Matrix(m.tolist()), Matrix(b.tolist())) for m, b in zip(matrices[:, index[n]], bases[:, index[n]])]
+        for n in controls
+    }
+
+    # Ground projection of the pivot, relative to its rest position
+    up = AXIS_INDEX[up_axis]
+    kept_axes = [AXIS_INDEX[a] for a in location_axes if AXIS_INDEX[a] != up]
+    pivot_rest = rig.data.bones[pivot].matrix_local
+    positions = np.array([tuple(m.translation - pivot_rest.translation) for m in pivot_matrices])
+    projected = np.zeros_like(positions)
+    projected[:, kept_axes] = positions[:, kept_axes]
+    projected = smooth(projected, smoothing)
+
+    up_vector = Vector((0.0, 0.0, 0.0))
+    up_vector[up] = 1.0
+    yaws = np.zeros(len(frames))
+    if use_rotation:
+        sign = -1.0 if forward_axis.startswith('-') else 1.0
+        axis = AXIS_INDEX[forward_axis[-1]]
+        plane = [i for i in range(3) if i != up]
+
+        def yaw(m):
+            forward = m.to_3x3().col[axis] * sign
+            return math.atan2(forward[plane[1]], forward[plane[0]])
+
+        rest_yaw = yaw(pivot_rest)
+        yaws = np.unwrap(np.array([yaw(m) for m in pivot_matrices])) - rest_yaw
+        yaws = smooth(yaws, smoothing)
+        if up == 1:
+            yaws = -yaws  # keep the rotation right-handed around Y
+
+    root_rest = rig.data.bones[root].matrix_local
+    root_new = [
+        Matrix.Translation(Vector(p)) @ Matrix.Rotation(y, 4, up_vector) @ root_rest
+        for p, y in zip(projected, yaws)
+    ]
+
+    # Root channels (root is a top level bone, its basis is relative to its rest)
+    root_rest_inv = root_rest.inverted()
+    write_bone_matrices(action, pb[root], frames, [root_rest_inv @ m for m in root_new])
+
+    # Compensation : keep the armature space matrix of every control under the root
+    for n in controls:
+        matrices = []
+        for old, new, (matrix, basis) in zip(root_old, root_new, samples[n]):
+            chain = old.inverted() @ matrix @ basis.inverted()  # root to bone rest, including constraints
+            matrices.append(chain.inverted() @ new.inverted() @ old @ chain @ basis)
+        write_bone_matrices(action, pb[n], frames, matrices)
+
+    pose_cache.invalidate(action)
+    return len(frames)
+
+
+#=============================================
+# Keyframe reduction
+#=============================================
+
+# Joint channels simplified together : data path property -> tolerance kind
+REDUCIBLE_CHANNELS = {
+    'location'            : 'LOCATION',
+    'rotation_quaternion' : 'QUATERNION',
+    'rotation_euler'      : 'ROTATION',
+    'rotation_axis_angle' : 'ROTATION',
+    'scale'               : 'SCALE',
+}
+
+INTERPOLATION_LINEAR = 1  # index of 'LINEAR' in the keyframe interpolation enum
+
+
+def channel_error(kind, interpolated, values):
+    """ Error of each interpolated sample : distance, radians or largest component difference.
+    """
+    if kind == 'LOCATION':
+        return np.linalg.norm(interpolated - values, axis=1)
+    if kind == 'QUATERNION':
+        q = interpolated / np.maximum(np.linalg.norm(interpolated, axis=1, keepdims=True), 1e-12)
+        n = values / np.maximum(np.linalg.norm(values, axis=1, keepdims=True), 1e-12)
+        return 2.0 * np.arccos(np.clip(np.abs((q * n).sum(axis=1)), 0.0, 1.0))
+    return np.abs(interpolated - values).max(axis=1)
+
+
+def simplify(frames, values, tolerance, kind):
+    """ Ramer-Douglas-Peucker on (n, channels) values against linear interpolation.
+        Returns (keep mask, max error of the dropped samples).
+    """
+    count = len(frames)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    max_error = 0.0
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        t = ((frames[first + 1:last] - frames[first]) / (frames[last] - frames[first]))[:, None]
+        interpolated = values[first] + t * (values[last] - values[first])
+        errors = channel_error(kind, interpolated, values[first + 1:last])
+        worst = int(errors.argmax())
+        if errors[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+        else:
+            max_error = max(max_error, float(errors[worst]))
+    return keep, max_error
+
+
+def read_keys(fcurve):
+    co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+    fcurve.keyframe_points.foreach_get('co', co)
+    return co[0::2], co[1::2]
+
+
+def channel_groups(action, bones=None):
+    """ {(bone, property): [fcurves by array index]} of the reducible bone channels of action.
+        bones : bone names to limit to, or None for all.
+    """
+    groups = {}
+    for fcurve in action.fcurves:
+        bone, _, prop = fcurve.data_path.partition('"].')
+        if not bone.startswith('pose.bones["') or prop not in REDUCIBLE_CHANNELS:
+            continue
+        bone = bone[len('pose.bones["'):]
+        if bones is None or bone in bones:
+            groups.setdefault((bone, prop), []).append(fcurve)
+    return groups
+
+
+def reduce_keys(action, tolerances, bones=None):
+    """ Remove the keys which linear interpolation reproduces within tolerances
+        ({'LOCATION', 'ROTATION', 'SCALE'} : distance, radians, factor).
+        The channels of a property are simplified together when they share their frames,
+        quaternions with an angle error. Kept keys are set to linear interpolation.
+        Returns (keys before, keys after, max error).
+    """
+    before = after = 0
+    max_error = 0.0
+    for (bone, prop), fcurves in channel_groups(action, bones).items():
+        kind = REDUCIBLE_CHANNELS[prop]
+        tolerance = tolerances['ROTATION' if kind == 'QUATERNION' else kind]
+        keys = [read_keys(fc) for fc in fcurves]
+        if all(len(f) == len(keys[0][0]) and np.array_equal(f, keys[0][0]) for f, _ in keys):
+            batches = [(fcurves, keys[0][0], np.stack([v for _, v in keys], axis=1), kind)]
+        else:
+            # Keys on different frames, each curve on its own
+            batches = [([fc], f, v[:, None], 'ROTATION' if kind == 'QUATERNION' else kind) for fc, (f, v) in zip(fcurves, keys)]
+        if kind == 'QUATERNION' and len(batches[0][0]) != 4:
+            batches = [(b[0], b[1], b[2], 'ROTATION') for b in batches]
+
+        for curves, frames, values, batch_kind in batches:
+            before += len(frames) * len(curves)
+            if len(frames) < 3 or any(fc.modifiers for fc in curves):
+                after += len(frames) * len(curves)
+                continue
+            keep, error = simplify(frames.astype(np.float64), values.astype(np.float64), tolerance, batch_kind)
+            max_error = max(max_error, error)
+            after += int(keep.sum()) * len(curves)
+            if keep.all():
+                continue
+            for i, fc in enumerate(curves):
+                group = fc.group.name if fc.group else ''
+                new = replace_fcurve(action, fc.data_path, fc.array_index, group, frames[keep], values[keep, i])
+                new.keyframe_points.foreach_set('interpolation', [INTERPOLATION_LINEAR] * int(keep.sum()))
+                new.update()
+    if after != before:
+        pose_cache.invalidate(action)
+    return before, after, max_error
+
+
+#=============================================
+# Quaternion continuity
+#=============================================
+
+def fix_quaternion_continuity(action, bones=None):
+    """ Flip the sign of the quaternion keys so that consecutive keys of a
+        bone stay on the same hemisphere (positive dot product).
+        Bones whose four curves don't share their frames are left as they are.
+        Returns the number of flipped keys.
+    """
+    flipped = 0
+    for (bone, prop), fcurves in channel_groups(action, bones).items():
+        if prop != 'rotation_quaternion' or len(fcurves) != 4:
+            continue
+        fcurves = sorted(fcurves, key=lambda fc: fc.array_index)
+        keys = [read_keys(fc) for fc in fcurves]
+        frames = keys[0][0]
+        if len(frames) < 2 or not all(np.array_equal(f, frames) for f, _ in keys):
+            continue
+        signs = continuous_signs(np.stack([v for _, v in keys], axis=1)).astype(np.float32)
+        flip = signs < 0.0
+        if not flip.any():
+            continue
+        flipped += int(flip.sum())
+        for fc in fcurves:
+            for attr in ('co', 'handle_left', 'handle_right'):
+                co = np.empty(len(frames) * 2, dtype=np.float32)
+                fc.keyframe_points.foreach_get(attr, co)
+                co[1::2] *= signs
+                fc.keyframe_points.foreach_set(attr, co)
+            fc.update()
+    if flipped:
+        pose_cache.invalidate(action)
+    return flipped
+
+
+#=============================================
+# Mirroring
+#=============================================
+
+MIRROR_X = np.diag([-1.0, 1.0, 1.0, 1.0])
+
+# Pose bone rotation property of the non Euler rotation modes
+ROTATION_PROPERTIES = { 'QUATERNION' : 'rotation_quaternion', 'AXIS_ANGLE' : 'rotation_axis_angle' }
+
+
+def rotation_property(rotation_mode):
+    return ROTATION_PROPERTIES.get(rotation_mode, 'rotation_euler')
+
+
+def mirror_pairs(rig):
+    """ {bone: mirrored bone} using the side tokens of the limb rigs. Bones without a pair map to themselves.
+    """
+    from .rigs.limbs.limb import Limb
+    pairs = {}
+    for bone in rig.data.bones:
+        side, opposite = Limb.extract_side_tokens(bone.name)
+        partner = bone.name
+        if side:
+            head, tail = bone.name.rsplit(side, 1)
+            if head + opposite + tail in rig.data.bones:
+                partner = head + opposite + tail
+        pairs[bone.name] = partner
+    return pairs
+
+
+def quaternions_to_matrices(q):
+    q = q / np.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def matrices_to_quaternions(m):
+    """ (n, 3, 3) rotation matrices to (n, 4) wxyz quaternions, choosing the stable formula per matrix.
+    """
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    candidates = np.stack([
+        np.stack([1 + trace, m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]], axis=1),
+        np.stack([m[:, 2, 1] - m[:, 1, 2], 1 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2], m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0]], axis=1),
+        np.stack([m[:, 0, 2] - m[:, 2, 0], m[:, 0, 1] + m[:, 1, 0], 1 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2], m[:, 1, 2] + m[:, 2, 1]], axis=1),
+        np.stack([m[:, 1, 0] - m[:, 0, 1], m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1], 1 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2]], axis=1),
+    ], axis=1)
+    pivot = np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1).argmax(axis=1)
+    q = candidates[np.arange(len(m)), pivot]
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def continuous_signs(q):
+    """ Signs keeping consecutive quaternions of (n, 4) q on the same hemisphere.
+    """
+    dots = (q[1:] * q[:-1]).sum(axis=1)
+    return np.concatenate([[1.0], np.cumprod(np.where(dots < 0.0, -1.0, 1.0))])
+
+
+def axis_rotations(axis, angles):
+    """ (n, 3, 3) rotation matrices of angles around the axis of index axis.
+    """
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    c, s = np.cos(angles), np.sin(angles)
+    m = np.zeros((len(angles), 3, 3))
+    m[:, axis, axis] = 1.0
+    m[:, i, i] = c
+    m[:, j, j] = c
+    m[:, j, i] = s
+    m[:, i, j] = -s
+    return m
+
+
+def eulers_to_matrices(e, order):
+    """ (n, 3) Euler angles in the rotation mode order (e.g. 'YXZ', first axis applied first) to (n, 3, 3) matrices.
+    """
+    m = np.broadcast_to(np.eye(3), (len(e), 3, 3))
+    for axis in order:
+        m = axis_rotations(AXIS_INDEX[axis], e[:, AXIS_INDEX[axis]]) @ m
+    return m
+
+
+def matrices_to_eulers(m, order):
+    """ (n, 3, 3) rotation matrices to (n, 3) Euler angles in the rotation mode order.
+    """
+    i, j, k = (AXIS_INDEX[a] for a in order)
+    s = 1.0 if (j - i) % 3 == 1 else -1.0
+    e = np.empty((len(m), 3))
+    cos_b = np.hypot(m[:, i, i], m[:, j, i])
+    e[:, j] = np.arctan2(-s * m[:, k, i], cos_b)
+    locked = cos_b < 1e-6
+    e[:, i] = np.where(locked, np.arctan2(-s * m[:, j, k], m[:, j, j]), np.arctan2(s * m[:, k, j], m[:, k, k]))
+    e[:, k] = np.where(locked, 0.0, np.arctan2(s * m[:, j, i], m[:, i, i]))
+    return e
+
+
+def rotations_to_matrices(values, rotation_mode):
+    """ (n, 3, 3) matrices of the (n, 3 or 4) values of the rotation property of rotation_mode.
+    """
+    if rotation_mode == 'QUATERNION':
+        return quaternions_to_matrices(values)
+    if rotation_mode == 'AXIS_ANGLE':
+        angle, axis = values[:, 0], values[:, 1:]
+        length = np.linalg.norm(axis, axis=1)
+        axis = np.divide(axis, length[:, None], out=np.zeros_like(axis), where=length[:, None] > 0.0)
+        q = np.concatenate([np.cos(angle / 2)[:, None], axis * np.sin(angle / 2)[:, None]], axis=1)
+        q[length == 0.0] = (1.0, 0.0, 0.0, 0.0)
+        return quaternions_to_matrices(q)
+    return eulers_to_matrices(values, rotation_mode)
+
+
+def matrices_to_rotations(m, rotation_mode):
+    """ Inverse of rotations_to_matrices, continuous along the first axis.
+    """
+    if rotation_mode not in ROTATION_PROPERTIES:
+        return np.unwrap(matrices_to_eulers(m, rotation_mode), axis=0)
+    q = matrices_to_quaternions(m)
+    if len(q):
+        q *= continuous_signs(q)[:, None] * (-1.0 if q[0, 0] < 0.0 else 1.0)
+    if rotation_mode == 'QUATERNION':
+        return q
+    length = np.linalg.norm(q[:, 1:], axis=1)
+    axis = np.divide(q[:, 1:], length[:, None], out=np.tile([0.0, 1.0, 0.0], (len(q), 1)), where=length[:, None] > 1e-12)
+    return np.concatenate([(2.0 * np.arctan2(length, q[:, 0]))[:, None], axis], axis=1)
+
+
+def bone_channels(action, pb, fcurves):
+    """ (frames, locations, rotations, scales) arrays of a bone, rotations
+        being the values of the rotation property of its rotation mode.
+        Curves keyed on the same frames are read in bulk, others are evaluated on the union of the frames.
+    """
+    keys = { (fc.data_path.rsplit('.', 1)[-1], fc.array_index) : read_keys(fc) for fc in fcurves }
+    frames = np.unique(np.concatenate([f for f, _ in keys.values()]))
+    rotation = rotation_property(pb.rotation_mode)
+    defaults = { 'location' : pb.location, rotation : getattr(pb, rotation), 'scale' : pb.scale }
+    channels = []
+    for prop, size in (('location', 3), (rotation, len(defaults[rotation])), ('scale', 3)):
+        columns = []
+        for i in range(size):
+            if (prop, i) not in keys:
+                columns.append(np.full(len(frames), defaults[prop][i]))
+                continue
+            f, v = keys[(prop, i)]
+            if not np.array_equal(f, frames):
+                fc = next(c for c in fcurves if c.data_path.endswith(prop) and c.array_index == i)
+                v = np.array([fc.evaluate(x) for x in frames])
+            columns.append(v)
+        channels.append(np.stack(columns, axis=1).astype(np.float64))
+    return frames, channels[0], channels[1], channels[2]
+
+
+def mirror_action(rig, action, name=None):
+    """ New action with the bone animation of action mirrored on the armature X axis.
+        The local channels of each bone are conjugated by its rest matrix and the
+        rest matrix of its side partner, so asymmetric rest poses are accounted for.
+        Rotations are read in the rotation mode of the bone and written in the
+        one of its partner. Returns the new action.
+    """
+    pairs = mirror_pairs(rig)
+    if name is None:
+        flipped = bpy.utils.flip_name(action.name)
+        name = flipped if flipped != action.name else action.name + "_mirrored"
+    mirrored = bpy.data.actions.new(name)
+
+    transforms = {}
+    for fc in action.fcurves:
+        bone, _, prop = fc.data_path.partition('"].')
+        bone = bone[len('pose.bones["'):] if bone.startswith('pose.bones["') else None
+        if bone in pairs and prop in ('location', rotation_property(rig.pose.bones[bone].rotation_mode), 'scale'):
+            transforms.setdefault(bone, []).append(fc)
+            continue
+        # Other curves (custom properties, unused rotation properties, object channels) move to the partner as they are
+        data_path = fc.data_path
+        if bone in pairs:
+            data_path = 'pose.bones["%s"]%s' % (pairs[bone], fc.data_path[len('pose.bones["%s"]' % bone):])
+        frames, values = read_keys(fc)
+        group = pairs.get(fc.group.name, fc.group.name) if fc.group else ''
+        replace_fcurve(mirrored, data_path, fc.array_index, group, frames, values)
+
+    for bone, fcurves in transforms.items():
+        partner = pairs[bone]
+        rest = np.array(rig.data.bones[bone].matrix_local)
+        partner_rest = np.array(rig.data.bones[partner].matrix_local)
+        conjugate = np.linalg.inv(partner_rest) @ MIRROR_X @ rest
+        conjugate_inv = np.linalg.inv(conjugate)
+
+        frames, locations, rotations, scales = bone_channels(action, rig.pose.bones[bone], fcurves)
+        basis = np.zeros((len(frames), 4, 4))
+        basis[:, :3, :3] = rotations_to_matrices(rotations, rig.pose.bones[bone].rotation_mode) * scales[:, None, :]
+        basis[:, :3, 3] = locations
+        basis[:, 3, 3] = 1.0
+        result = conjugate @ basis @ conjugate_inv
+
+        new_scales = np.linalg.norm(result[:, :3, :3], axis=1)
+        partner_mode = rig.pose.bones[partner].rotation_mode
+        new_rotations = matrices_to_rotations(result[:, :3, :3] / new_scales[:, None, :], partner_mode)
+
+        prefix = 'pose.bones["%s"].' % partner
+        for prop, values in (('location', result[:, :3, 3]), (rotation_property(partner_mode), new_rotations), ('scale', new_scales)):
+            for i in range(values.shape[1]):
+                replace_fcurve(mirrored, prefix + prop, i, partner, frames, values[:, i])
+    return mirrored
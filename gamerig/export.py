@@ -0,0 +1,331 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Game export : a deform-only armature mirroring the deforming ORG bones
+    of a generated rig, with the rig actions baked onto it.
+"""
+
+import bpy
+import os
+import json
+import time
+import numpy as np
+from mathutils import Matrix
+
+from .utils import is_org
+from . import pose_cache
+
+EXPORT_SUFFIX = "_export"
+CONSTANT_EPSILON = 1e-5  # channels varying less than this are written as a single key
+SOURCE_SUFFIX = ".gamerig_src"  # original actions are renamed while the baked ones take their names
+DUMP_FORMAT = "gamerig-animation"
+DUMP_VERSION = 1
+
+
+def deform_bone_names(rig):
+    return [b.name for b in rig.data.bones if b.use_deform and is_org(b.name)]
+
+
+def deform_parents(rig, names):
+    """ {bone: nearest exported ancestor or None}
+    """
+    names = set(names)
+    parents = {}
+    for name in names:
+        parent = rig.data.bones[name].parent
+        while parent and parent.name not in names:
+            parent = parent.parent
+        parents[name] = parent.name if parent else None
+    return parents
+
+
+def build_deform_armature(context, rig, names, parents, suffix=EXPORT_SUFFIX):
+    """ New armature object with the rest pose of the exported bones of rig.
+        Must be called in object mode.
+    """
+    data = bpy.data.armatures.new(rig.data.name + suffix)
+    obj = bpy.data.objects.new(rig.name + suffix, data)
+    context.collection.objects.link(obj)
+    obj.matrix_world = rig.matrix_world
+
+    view_layer = context.view_layer
+    active = view_layer.objects.active
+    view_layer.objects.active = obj
+    bpy.ops.object.mode_set(mode='EDIT')
+    for name in names:
+        bone = rig.data.bones[name]
+        eb = data.edit_bones.new(name)
+        eb.head = bone.head_local
+        eb.tail = bone.tail_local
+        eb.matrix = bone.matrix_local
+        eb.use_deform = True
+    for name in names:
+        if parents[name]:
+            data.edit_bones[name].parent = data.edit_bones[parents[name]]
+    bpy.ops.object.mode_set(mode='OBJECT')
+    view_layer.objects.active = active
+    return obj
+
+
+def sample_action(context, rig, action, names, parents):
+    """ Evaluated pose of rig on every frame of action, through the pose cache.
+        Returns (frames, {bone: (locations, rotations, scales)}) of the
+        deform armature pose channels.
+    """
+    start, end = (int(round(f)) for f in action.frame_range)
+    frames = list(range(start, end + 1))
+    bones, matrices, _ = pose_cache.sample(context, rig, action, frames)
+    index = { n : i for i, n in enumerate(bones) }
+
+    rest = { n : rig.data.bones[n].matrix_local for n in names }
+    rest_inv = {
+        n : (rest[parents[n]].inverted() @ rest[n] if parents[n] else rest[n]).inverted()
+        for n in names
+    }
+    channels = { n : ([], [], []) for n in names }
+
+    for pose in matrices:
+        pose = { n : Matrix(pose[index[n]].tolist()) for n in names }
+        for n in names:
+            p = parents[n]
+            matrix = pose[p].inverted() @ pose[n] if p else pose[n]
+            loc, rot, scale = (rest_inv[n] @ matrix).decompose()
+            locations, rotations, scales = channels[n]
+            if rotations:
+                rot.make_compatible(rotations[-1])
+            locations.append(loc)
+            rotations.append(rot)
+            scales.append(scale)
+
+    return frames, channels
+
+
+def write_action(name, frames, channels):
+    """ Create an action from sampled channels, writing the keys in bulk.
+        Constant channels get a single key.
+    """
+    action = bpy.data.actions.new(name)
+    for bone, values in channels.items():
+        prefix = 'pose.bones["%s"].' % bone
+        for prop, samples in zip(('location', 'rotation_quaternion', 'scale'), values):
+            for i in range(len(samples[0])):
+                column = [v[i] for v in samples]
+                keyed_frames = frames
+                if max(column) - min(column) < CONSTANT_EPSILON:
+                    keyed_frames, column = frames[:1], column[:1]
+                fcurve = action.fcurves.new(prefix + prop, index=i, action_group=bone)
+                fcurve.keyframe_points.add(len(column))
+                fcurve.keyframe_points.foreach_set('co', [x for key in zip(keyed_frames, column) for x in key])
+                fcurve.update()
+    return action
+
+
+def push_to_nla(obj, baked):
+    """ One NLA track per baked action, named after its source action.
+        The strips keep the baked actions alive in the saved file, and the
+        exporters take the animations strip by strip from them.
+    """
+    for source, action in baked:
+        track = obj.animation_data.nla_tracks.new()
+        track.name = source.name
+        track.strips.new(source.name, int(action.frame_range[0]), action)
+
+
+def rig_actions(rig):
+    """ Actions animating bones of rig.
+    """
+    bones = rig.pose.bones
+    actions = []
+    for action in bpy.data.actions:
+        for fcurve in action.fcurves:
+            if fcurve.data_path.startswith('pose.bones["') and fcurve.data_path[12:].split('"]', 1)[0] in bones:
+                actions.append(action)
+                break
+    return actions
+
+
+def skinned_meshes(context, rig):
+    return [
+        ob for ob in context.scene.objects if ob.type == 'MESH'
+        and any(m.type == 'ARMATURE' and m.object == rig for m in ob.modifiers)
+    ]
+
+
+def export_files(exporter, filepath):
+    """ Export the selection with the NLA strips of push_to_nla() as its animations.
+        FBX always samples, but only the constraint free deform armature.
+    """
+    if exporter == 'FBX':
+        bpy.ops.export_scene.fbx(
+            filepath=filepath, use_selection=True, object_types={'ARMATURE', 'MESH'},
+            add_leaf_bones=False, use_armature_deform_only=True,
+            bake_anim=True, bake_anim_use_all_actions=False, bake_anim_use_nla_strips=True,
+        )
+    elif exporter == 'GLTF':
+        bpy.ops.export_scene.gltf(
+            filepath=filepath, use_selection=True, export_def_bones=True,
+            export_animations=True, export_animation_mode='NLA_TRACKS', export_force_sampling=False,
+        )
+
+
+def export_rig(context, rig, actions, exporter='NONE', filepath=''):
+    """ Build the deform armature of rig, bake actions onto it and export it with the skinned meshes.
+        exporter : 'FBX', 'GLTF' or 'NONE' to leave the baked armature in the scene.
+        Returns (deform armature or None, baked action count, frame count, seconds).
+    """
+    start_time = time.perf_counter()
+    view_layer = context.view_layer
+    names = deform_bone_names(rig)
+    parents = deform_parents(rig, names)
+
+    if context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    deform = build_deform_armature(context, rig, names, parents)
+
+    baked = []
+    frame_count = 0
+    for action in actions:
+        frames, channels = sample_action(context, rig, action, names, parents)
+        baked.append((action, write_action(action.name + EXPORT_SUFFIX, frames, channels)))
+        frame_count += len(frames)
+
+    deform.animation_data_create()
+    push_to_nla(deform, baked)
+    if exporter == 'NONE' and baked:
+        # Play the first one, the muted tracks hold the others
+        deform.animation_data.action = baked[0][1]
+        for track in deform.animation_data.nla_tracks:
+            track.mute = True
+
+    if exporter != 'NONE':
+        meshes = skinned_meshes(context, rig)
+        modifiers = [m for ob in meshes for m in ob.modifiers if m.type == 'ARMATURE' and m.object == rig]
+        selection = [ob for ob in view_layer.objects if ob.select_get()]
+        active = view_layer.objects.active
+        action_names = [source.name for source, _ in baked]
+        try:
+            # The baked actions take the names of the originals in the exported file
+            for (source, action), name in zip(baked, action_names):
+                source.name = name + SOURCE_SUFFIX
+                action.name = name
+            for m in modifiers:
+                m.object = deform
+            for ob in selection:
+                ob.select_set(False)
+            for ob in meshes + [deform]:
+                ob.select_set(True)
+            view_layer.objects.active = deform
+            export_files(exporter, filepath)
+        finally:
+            for m in modifiers:
+                m.object = rig
+            for (source, action), name in zip(baked, action_names):
+                action.name = name + EXPORT_SUFFIX
+                source.name = name
+            for ob in view_layer.objects:
+                ob.select_set(ob in selection)
+            view_layer.objects.active = active
+            for _, action in baked:
+                bpy.data.actions.remove(action)
+            data = deform.data
+            bpy.data.objects.remove(deform)
+            bpy.data.armatures.remove(data)
+            deform = None
+
+    return deform, len(baked), frame_count, time.perf_counter() - start_time
+
+
+def hierarchy_order(rig, names):
+    """ names sorted parents first.
+    """
+    return sorted(names, key=lambda n: len(rig.data.bones[n].parent_recursive))
+
+
+def channel_arrays(names, channels):
+    """ (frames, bones, 3) translation, (frames, bones, 4) wxyz rotation and (frames, bones, 3) scale arrays.
+    """
+    return tuple(
+        np.array([[tuple(v) for v in channels[n][c]] for n in names], dtype=np.float32).reshape(len(names), -1, size).transpose(1, 0, 2)
+        for c, size in ((0, 3), (1, 4), (2, 3))
+    )
+
+
+def write_dump(filepath, header, arrays):
+    """ Write arrays with a JSON header, as .npz or as a .json header and a raw little-endian .bin file.
+    """
+    if filepath.lower().endswith('.npz'):
+        arrays = dict(arrays)
+        arrays['header'] = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+        np.savez(filepath, **arrays)
+        return
+    base = os.path.splitext(filepath)[0]
+    header['binary'] = os.path.basename(base) + '.bin'
+    header['arrays'] = {}
+    offset = 0
+    with open(base + '.bin', 'wb') as f:
+        for name, array in arrays.items():
+            data = array.astype(array.dtype.newbyteorder('<'), copy=False)
+            header['arrays'][name] = { 'offset' : offset, 'shape' : list(data.shape), 'dtype' : data.dtype.str }
+            f.write(data.tobytes())
+            offset += data.nbytes
+    with open(base + '.json', 'w') as f:
+        json.dump(header, f, indent=1)
+
+
+def dump_rig(context, rig, actions, filepath):
+    """ Write the deform bone hierarchy, bind poses and the sampled local
+        transforms of actions, for engine pipelines that don't need Blender.
+        Translation/rotation(wxyz)/scale are relative to the parent bone's
+        rest, like pose bone channels.
+        Returns (frame count, seconds).
+    """
+    start_time = time.perf_counter()
+    scene = context.scene
+    names = hierarchy_order(rig, deform_bone_names(rig))
+    parents = deform_parents(rig, names)
+    index = { n : i for i, n in enumerate(names) }
+
+    arrays = {
+        'parents' : np.array([index[parents[n]] if parents[n] else -1 for n in names], dtype=np.int32),
+        'bind'    : np.array([[list(row) for row in rig.data.bones[n].matrix_local] for n in names], dtype=np.float32).reshape(-1, 4, 4),
+    }
+    header = {
+        'format'   : DUMP_FORMAT,
+        'version'  : DUMP_VERSION,
+        'rig'      : rig.name,
+        'fps'      : scene.render.fps / scene.render.fps_base,
+        'bones'    : names,
+        'bind'     : "armature space rest matrices, row major",
+        'rotation' : "quaternion w, x, y, z",
+        'actions'  : [],
+    }
+
+    frame_count = 0
+    for i, action in enumerate(actions):
+        frames, channels = sample_action(context, rig, action, names, parents)
+        translation, rotation, scale = channel_arrays(names, channels)
+        arrays['action%d_translation' % i] = translation
+        arrays['action%d_rotation' % i] = rotation
+        arrays['action%d_scale' % i] = scale
+        header['actions'].append({ 'name' : action.name, 'frame_start' : frames[0], 'frame_count' : len(frames) })
+        frame_count += len(frames)
+
+    write_dump(filepath, header, arrays)
+    return frame_count, time.perf_counter() - start_time
@@ -20,22 +20,26 @@
 
 import bpy
 import re
+import json
 import time
+import inspect
 import traceback
 import sys
 from .utils import (
     rig_module_name, get_rig_type, create_widget, assign_all_widgets,
     is_org, is_mch, is_jig, random_id, basename,
-    copy_attributes, gamma_correct, get_rig_name, copy_bone,
-    begin_progress, update_progress, end_progress,
+    copy_attributes, gamma_correct, get_rig_name, copy_bone, legacy_parameter_keys, fold_driver_modifiers,
+    begin_progress, update_progress, skip_progress, end_progress,
     MetarigError
 )
-from . import rig_lists
-from mathutils import Vector
+from . import rig_lists, analysis, optimizer, lod
 
 
 RIG_MODULE = "rigs"
 
+report = []  # warnings of the last generation
+folded_modifiers = {}  # {rig: count of driver F-Modifiers folded into expressions} of the last generation
+
 
 class Timer:
     def __init__(self):
@@ -43,13 +47,43 @@ class Timer:
 
     def tick(self, string):
         t = time.time()
-        print(string + "%.3f" % (t - self.timez))
+        elapsed = t - self.timez
+        print(string + "%.3f" % elapsed)
         self.timez = t
+        return elapsed
 
 
 def generate_rig(context, metarig):
     """ Generates a rig from a metarig.
+        Returns an error string, or None on success.
+    """
+    steps = generate_rig_steps(context, metarig)
+    while True:
+        try:
+            resume(steps, context)
+        except StopIteration as e:
+            return e.value
+
+
+def resume(steps, context):
+    """ Run the next step of generate_rig_steps with the context of the current call.
+        Context members are only valid during the call that got them, the
+        generator must not keep using the context of a previous one.
+    """
+    if inspect.getgeneratorstate(steps) == inspect.GEN_CREATED:
+        next(steps)
+    steps.send(context)
+
+
+def generate_rig_steps(context, metarig):
+    """ Resumable generation of a rig from a metarig.
+        Yields after rig initialization and after each rig's generate/postprocess
+        so that the caller can keep the UI alive, show progress or cancel by
+        closing the generator. The error string (or None) is the return value.
+        Advance it with resume(), which sends in the context of each resuming call.
     """
+    # Wait for the context of the first resuming call
+    context = yield
     t = Timer()
 
     # clear created widget list
@@ -58,6 +92,13 @@ def generate_rig(context, metarig):
     # clear copied bone list
     if hasattr(copy_bone, 'copied'):
         del copy_bone.copied
+    optimizer.reset_stats()
+    report.clear()
+    folded_modifiers.clear()
+
+    # Refuse metarigs which still store rig parameters in the old flat layout
+    if any(legacy_parameter_keys(pb) for pb in metarig.pose.bones):
+        return "GAMERIG ERROR: Metarig '%s' has old format rig parameters. Migrate it from the Bone properties." % metarig.name
 
     # Find overwrite target rig if exists
     rig_name = get_rig_name(metarig)
@@ -67,7 +108,7 @@ def generate_rig(context, metarig):
         metarig.data.gamerig.rig_name = rig_name
 
     print("Fetch rig (%s)." % rig_name)
-    obj = next((i for i in context.collection.objects if i != metarig and i.type == 'ARMATURE' and i.name == rig_name), None)
+    obj = existing_rig(context, metarig)
     if obj and not obj in context.visible_objects:
         return "GAMERIG ERROR: Overwritee rig '%s' is hidden. Cannot Operate." % obj.name
 
@@ -87,204 +128,176 @@ def generate_rig(context, metarig):
     #------------------------------------------
     # Create/find the rig object and set it up
 
-    # Check if the generated rig already exists, so we can
-    # regenerate in the same object.  If not, create a new
-    # object to generate the rig in.
-    
-    previous_action = None
-    previous_nla_tracks = None
-    previous_nla_strips = {}
-    toggledArmatureModifiers = []
-    if obj:
-        print("Overwrite existing rig.")
-        try:
-            # toggle armature object to metarig if it using generated rig.
-            # (referensing rig overwriting makes script runs very slowly)
-            for i in collection.objects:
-                for j in i.modifiers:
-                    if j.type == 'ARMATURE' and j.object == obj:
-                        toggledArmatureModifiers.append(j)
-                        j.object = metarig
-            # Get rid of anim data in case the rig already existed
-            print("Clear rig animation data.")
-            if obj.animation_data:
-                previous_action = obj.animation_data.action
-                previous_nla_tracks = tuple(obj.animation_data.nla_tracks)
-                for i in previous_nla_tracks:
-                    previous_nla_strips[i] = tuple(i.strips)
-            obj.animation_data_clear()
-            obj.data.animation_data_clear()
-        except KeyError:
-            print("Overwrite failed.")
-            obj = None
-    
-    if obj is None:
-        print("Create new rig.")
-        name = metarig.data.gamerig.rig_name or "rig"
-        obj = bpy.data.objects.new(name, bpy.data.armatures.new(name))  # in case name 'rig' exists it will be rig.001
-        obj.display_type = 'WIRE'
-        collection.objects.link(obj)
+    # Check if the generated rig already exists. The rig is always generated
+    # into a new scratch object, the existing one is left untouched until
+    # the generation succeeded and then replaced in one step (see swap_rig).
+    target = obj
+    temp_rigs = []  # names of the temporary metarig copies merged into the scratch rig
+    try:
+        if target:
+            print("Overwrite existing rig.")
+            obj = bpy.data.objects.new(target.name, bpy.data.armatures.new(target.data.name))
+            collection.objects.link(obj)
+            for attr in ('parent', 'parent_type', 'parent_bone', 'matrix_parent_inverse',
+                         'location', 'rotation_mode', 'rotation_euler', 'rotation_quaternion', 'rotation_axis_angle', 'scale',
+                         'display_type', 'show_in_front'):
+                setattr(obj, attr, getattr(target, attr))
+            for attr in ('display_type', 'show_names', 'show_axes'):
+                setattr(obj.data, attr, getattr(target.data, attr))
+            for prop in target.keys():
+                if prop != "_RNA_UI":
+                    copy_custom_property(target, obj, prop)
+            for prop in target.data.keys():
+                if prop not in ("_RNA_UI", "gamerig", "gamerig_profile", "gamerig_parts_state"):  # stale after regeneration
+                    copy_custom_property(target.data, obj.data, prop)
+            # Object constraints and the other collections the rig is in
+            for con in target.constraints:
+                copy_attributes(con, obj.constraints.new(con.type))
+            for col in target.users_collection:
+                if obj.name not in col.objects:
+                    col.objects.link(obj)
+        else:
+            print("Create new rig.")
+            name = metarig.data.gamerig.rig_name or "rig"
+            obj = bpy.data.objects.new(name, bpy.data.armatures.new(name))  # in case name 'rig' exists it will be rig.001
+            obj.display_type = 'WIRE'
+            collection.objects.link(obj)
+            obj.location            = metarig.location
+            obj.rotation_mode       = metarig.rotation_mode
+            obj.rotation_euler      = metarig.rotation_euler
+            obj.rotation_quaternion = metarig.rotation_quaternion
+            obj.rotation_axis_angle = metarig.rotation_axis_angle
+            obj.scale               = metarig.scale
         # Put the rig_name in the armature custom properties
         obj.data["gamerig_id"] = rig_id
-        obj.location            = metarig.location
-        obj.rotation_mode       = metarig.rotation_mode
-        obj.rotation_euler      = metarig.rotation_euler
-        obj.rotation_quaternion = metarig.rotation_quaternion
-        obj.rotation_axis_angle = metarig.rotation_axis_angle
-        obj.scale               = metarig.scale
-
-    # apply rotation for metarig / rig
-    bpy.ops.object.select_all(action='DESELECT')
-    metarig_rotation_euler_backup      = metarig.rotation_euler.copy()
-    metarig_rotation_quaternion_backup = metarig.rotation_quaternion.copy()
-    metarig_rotation_axis_angle_backup = Vector(metarig.rotation_axis_angle)
-    rig_rotation_euler_backup      = obj.rotation_euler.copy()
-    rig_rotation_quaternion_backup = obj.rotation_quaternion.copy()
-    rig_rotation_axis_angle_backup = Vector(obj.rotation_axis_angle)
-    metarig_needs_apply_rot = abs(metarig_rotation_axis_angle_backup.angle) > 0 if metarig.rotation_mode == 'AXIS_ANGLE' else \
-        abs(metarig_rotation_quaternion_backup.angle) > 0 if metarig.rotation_mode == 'QUATERNION' else \
-        abs(metarig_rotation_euler_backup.x) > 0 or abs(metarig_rotation_euler_backup.y) > 0 or abs(metarig_rotation_euler_backup.z) > 0
-    obj_needs_apply_rot = abs(rig_rotation_axis_angle_backup.angle) > 0 if obj.rotation_mode == 'AXIS_ANGLE' else \
-        abs(rig_rotation_quaternion_backup.angle) > 0 if obj.rotation_mode == 'QUATERNION' else \
-        abs(rig_rotation_euler_backup.x) > 0 or abs(rig_rotation_euler_backup.y) > 0 or abs(rig_rotation_euler_backup.z) > 0
-    metarig.select_set(metarig_needs_apply_rot)
-    obj.select_set(obj_needs_apply_rot)
-    if metarig_needs_apply_rot or obj_needs_apply_rot:
-        bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
 
-    obj.data.pose_position = 'POSE'
+        # The rigs are generated in world orientation. Instead of applying the
+        # object rotations, the bone data is rotated and the object transforms
+        # are left as they are.
+        metarig_rotation = object_rotation(metarig)
+        rig_rotation = object_rotation(obj)
 
-    # Select generated rig object
-    metarig.select_set(False)
-    obj.select_set(True)
-    view_layer.objects.active = obj
-
-    # Get parented objects to restore later
-    childs = {}  # {object: bone}
-    for child in obj.children:
-        childs[child] = child.parent_bone
-
-    # Remove all bones from the generated rig armature.
-    bpy.ops.object.mode_set(mode='EDIT')
-    for bone in obj.data.edit_bones:
-        obj.data.edit_bones.remove(bone)
-    bpy.ops.object.mode_set(mode='OBJECT')
-
-    # Remove all bone collections.
-    for col in list(obj.data.collections):
-        obj.data.collections.remove(col)
-    bpy.ops.object.mode_set(mode='OBJECT')
+        obj.data.pose_position = 'POSE'
 
-    # Create temporary duplicates for merging
-    temp_rig_1 = metarig.copy()
-    temp_rig_1.data = metarig.data.copy()
-    collection.objects.link(temp_rig_1)
+        # Select generated rig object
+        metarig.select_set(False)
+        obj.select_set(True)
+        view_layer.objects.active = obj
+
+        # Create temporary duplicates for merging
+        temp_rig_1 = metarig.copy()
+        temp_rig_1.data = metarig.data.copy()
+        collection.objects.link(temp_rig_1)
+        temp_rigs.append(temp_rig_1.name)
+
+        temp_rig_2 = metarig.copy()
+        temp_rig_2.data = obj.data
+        collection.objects.link(temp_rig_2)
+        temp_rigs.append(temp_rig_2.name)
+
+        # Select the temp rigs for merging
+        for objt in collection.objects:
+            objt.select_set(False)  # deselect all objects
+        temp_rig_1.select_set(True)
+        temp_rig_2.select_set(True)
+        view_layer.objects.active = temp_rig_2
+
+        # Merge the temporary rigs
+        bpy.ops.object.join()
+
+        # Delete the second temp rig
+        bpy.ops.object.delete()
+
+        if metarig_rotation.angle > 0:
+            obj.data.transform(metarig_rotation.to_matrix().to_4x4())
+
+        # Select the generated rig
+        for objt in view_layer.objects:
+            objt.select_set(False)  # deselect all objects
+        obj.select_set(True)
+        view_layer.objects.active = obj
 
-    temp_rig_2 = metarig.copy()
-    temp_rig_2.data = obj.data
-    collection.objects.link(temp_rig_2)
+        # Copy metarig's Custom properties to rig
+        for prop in metarig.data.keys():
+            try:
+                if prop != "_RNA_UI" and prop != "gamerig" and prop != "gamerig_id":
+                    obj.data[prop] = metarig.data[prop]
+                    try:
+                        org_ui = metarig.data.id_properties_ui(prop)
+                        obj.data.id_properties_ui(prop).update_from(org_ui)
+                    except TypeError:
+                        pass
+            except KeyError:
+                pass
 
-    # Select the temp rigs for merging
-    for objt in collection.objects:
-        objt.select_set(False)  # deselect all objects
-    temp_rig_1.select_set(True)
-    temp_rig_2.select_set(True)
-    view_layer.objects.active = temp_rig_2
+        # Copy over bone properties
+        for bone in metarig.data.bones:
+            bone_gen = obj.data.bones[bone.name]
 
-    # Merge the temporary rigs
-    bpy.ops.object.join()
+            # B-bone stuff
+            bone_gen.bbone_segments = bone.bbone_segments
+            bone_gen.bbone_easein = bone.bbone_easein
+            bone_gen.bbone_easeout = bone.bbone_easeout
 
-    # Delete the second temp rig
-    bpy.ops.object.delete()
+        # Copy over the pose_bone properties
+        for bone in metarig.pose.bones:
+            bone_gen = obj.pose.bones[bone.name]
 
-    # Select the generated rig
-    for objt in view_layer.objects:
-        objt.select_set(False)  # deselect all objects
-    obj.select_set(True)
-    view_layer.objects.active = obj
+            # Rotation mode and transform locks
+            bone_gen.rotation_mode = bone.rotation_mode
+            bone_gen.lock_rotation = tuple(bone.lock_rotation)
+            bone_gen.lock_rotation_w = bone.lock_rotation_w
+            bone_gen.lock_rotations_4d = bone.lock_rotations_4d
+            bone_gen.lock_location = tuple(bone.lock_location)
+            bone_gen.lock_scale = tuple(bone.lock_scale)
 
-    # Copy metarig's Custom properties to rig
-    for prop in metarig.data.keys():
-        try:
-            if prop != "_RNA_UI" and prop != "gamerig" and prop != "gamerig_id":
-                obj.data[prop] = metarig.data[prop]
+            # Custom properties
+            for prop in bone.keys():
                 try:
-                    org_ui = metarig.data.id_properties_ui(prop)
-                    obj.data.id_properties_ui(prop).update_from(org_ui)
-                except TypeError:
+                    bone_gen[prop] = bone[prop]
+                    try:
+                        org_ui = bone.id_properties_ui(prop)
+                        bone_gen.id_properties_ui(prop).update_from(org_ui)
+                    except TypeError:
+                        pass
+                except KeyError:
                     pass
-        except KeyError:
-            pass
 
-    # Copy over bone properties
-    for bone in metarig.data.bones:
-        bone_gen = obj.data.bones[bone.name]
-
-        # B-bone stuff
-        bone_gen.bbone_segments = bone.bbone_segments
-        bone_gen.bbone_easein = bone.bbone_easein
-        bone_gen.bbone_easeout = bone.bbone_easeout
-
-    # Copy over the pose_bone properties
-    for bone in metarig.pose.bones:
-        bone_gen = obj.pose.bones[bone.name]
-
-        # Rotation mode and transform locks
-        bone_gen.rotation_mode = bone.rotation_mode
-        bone_gen.lock_rotation = tuple(bone.lock_rotation)
-        bone_gen.lock_rotation_w = bone.lock_rotation_w
-        bone_gen.lock_rotations_4d = bone.lock_rotations_4d
-        bone_gen.lock_location = tuple(bone.lock_location)
-        bone_gen.lock_scale = tuple(bone.lock_scale)
-
-        # Custom properties
-        for prop in bone.keys():
-            try:
-                bone_gen[prop] = bone[prop]
+        # Clear drivers
+        if obj.animation_data:
+            for d in obj.animation_data.drivers:
                 try:
-                    org_ui = bone.id_properties_ui(prop)
-                    bone_gen.id_properties_ui(prop).update_from(org_ui)
+                    obj.driver_remove(d.data_path)
                 except TypeError:
                     pass
-            except KeyError:
-                pass
 
-    # Clear drivers
-    if obj.animation_data:
-        for d in obj.animation_data.drivers:
-            try:
-                obj.driver_remove(d.data_path)
-            except TypeError:
-                pass
-    
-    t.tick("Duplicate rig: ")
-    #----------------------------------
-    # Make a list of the original bones so we can keep track of them.
-    original_bones = [bone.name for bone in obj.data.bones]
-
-    # Create a sorted list of the original bones, sorted in the order we're
-    # going to traverse them for rigging.
-    # (root-most -> leaf-most, alphabetical)
-    bones_sorted = []
-    for name in original_bones:
-        bones_sorted.append(name)
-    bones_sorted.sort()  # first sort by names
-    bones_sorted.sort(key=lambda bone: len(obj.pose.bones[bone].parent_recursive))  # then parents before children
-    t.tick("Make list of org bones: ")
-
-    #----------------------------------
-    error = None
-    def append_error(bone, rig, e):
-        nonlocal error
-        errorstr  = "failed at rig '%s' (%s)." % (bone, rig.__class__.__module__) if rig else "failed at rig '%s'." % bone
-        errorstr += "\n   " + e.message
-        print("GameRig: %s" % errorstr)
-        if error:
-            error += '\n' + errorstr
-        else:
-            error = errorstr
-    
-    try:
+        t.tick("Duplicate rig: ")
+        #----------------------------------
+        # Make a list of the original bones so we can keep track of them.
+        original_bones = [bone.name for bone in obj.data.bones]
+
+        # Create a sorted list of the original bones, sorted in the order we're
+        # going to traverse them for rigging.
+        # (root-most -> leaf-most, alphabetical)
+        bones_sorted = []
+        for name in original_bones:
+            bones_sorted.append(name)
+        bones_sorted.sort()  # first sort by names
+        bones_sorted.sort(key=lambda bone: len(obj.pose.bones[bone].parent_recursive))  # then parents before children
+        t.tick("Make list of org bones: ")
+
+        #----------------------------------
+        error = None
+        def append_error(bone, rig, e):
+            nonlocal error
+            errorstr  = "failed at rig '%s' (%s)." % (bone, rig.__class__.__module__) if rig else "failed at rig '%s'." % bone
+            errorstr += "\n   " + e.message
+            print("GameRig: %s" % errorstr)
+            if error:
+                error += '\n' + errorstr
+            else:
+                error = errorstr
+
         # Collect/initialize all the rigs.
         rigs = {}
         rigtypes = set()
@@ -298,7 +311,8 @@ def generate_rig(context, metarig):
                 append_error(bone, None, e)
         t.tick("Initialize rigs: ")
 
-        begin_progress(len(rigs.keys()) * 2)
+        begin_progress([(metarig.name, 'generate', bone) for bone in rigs] + [(metarig.name, 'postprocess', bone) for bone in rigs])
+        context = yield
 
         # Generate all the rigs.
         bpy.ops.object.mode_set(mode='OBJECT')
@@ -306,10 +320,12 @@ def generate_rig(context, metarig):
         obj.select_set(True)
         tt = Timer()
         ui_scripts = []
+        bone_owners = {}  # {bone name: owner rig}
 
         # Go into editmode in the rig armature
         bpy.ops.object.mode_set(mode='EDIT')
         for bone, rig in dict(rigs.items()).items():
+            existing_bones = set(obj.data.edit_bones.keys())
             try:
                 script = rig.generate(context)
                 if script and len(script) > 0:
@@ -317,8 +333,15 @@ def generate_rig(context, metarig):
             except MetarigError as e:
                 append_error(bone, rig, e)
                 del rigs[bone]
-            tt.tick("Generate rig : %s (%s): " % (bone, rig.__class__.__module__))
-            update_progress()
+                skip_progress((metarig.name, 'postprocess', bone))
+            # Remember which rig made which bones
+            owner = rig_owner_name(rig, bone)
+            bone_owners[bone] = owner
+            for name in obj.data.edit_bones.keys():
+                if name not in existing_bones:
+                    bone_owners[name] = owner
+            update_progress((metarig.name, 'generate', bone), tt.tick("Generate rig : %s (%s): " % (bone, rig.__class__.__module__)))
+            context = yield
 
         # Go into objectmode in the rig armature
         bpy.ops.object.mode_set(mode='OBJECT')
@@ -365,10 +388,10 @@ def generate_rig(context, metarig):
                             v2.targets[i].id = obj
 
                         # Mark targets that may need to be altered after rig generation
-                        target = v2.targets[i]
+                        var_target = v2.targets[i]
                         # If a custom property
-                        if v2.type == 'SINGLE_PROP' and re.match('^pose.bones\["[^"\]]*"\]\["[^"\]]*"\]$', target.data_path):
-                            target.data_path = "GAMERIG-" + target.data_path
+                        if v2.type == 'SINGLE_PROP' and re.match('^pose.bones\["[^"\]]*"\]\["[^"\]]*"\]$', var_target.data_path):
+                            var_target.data_path = "GAMERIG-" + var_target.data_path
 
                 # Copy key frames
                 try:
@@ -380,183 +403,181 @@ def generate_rig(context, metarig):
                 except TypeError:
                     pass
         
+        seen_drivers = {key for key, _ in driver_fcurves(obj)}  # the drivers copied from the metarig are left as they are
         for bone, rig in rigs.items():
+            constraint_counts = { pb.name : len(pb.constraints) for pb in obj.pose.bones }
             try:
                 rig.postprocess(context)
             except MetarigError as e:
                 append_error(bone, rig, e)
-            tt.tick("PostProcess rig : %s (%s): " % (bone, rig.__class__.__module__))
-            update_progress()
+            # The bones a rig constrains without having made them (e.g. the
+            # other ORG bones of its chain) belong to it too
+            owner = rig_owner_name(rig, bone)
+            for pb in obj.pose.bones:
+                if len(pb.constraints) > constraint_counts.get(pb.name, 0):
+                    bone_owners.setdefault(pb.name, owner)
+            # Fold the linear mappings of the new drivers into expressions
+            folded = 0
+            for key, fcurve in driver_fcurves(obj):
+                if key not in seen_drivers:
+                    seen_drivers.add(key)
+                    folded += fold_driver_modifiers(fcurve)
+            if folded > 0:
+                folded_modifiers[rig_owner_name(rig, bone)] = folded
+                print("GameRig: folded %d driver modifier(s) of %s" % (folded, rig_owner_name(rig, bone)))
+            update_progress((metarig.name, 'postprocess', bone), tt.tick("PostProcess rig : %s (%s): " % (bone, rig.__class__.__module__)))
+            context = yield
         t.tick("Generate rigs: ")
-    except Exception as e:
-        # Cleanup if something goes wrong
-        print("GameRig: failed to generate rig.")
-        metarig.data.pose_position = rest_backup
-        obj.data.pose_position = 'POSE'
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        # Continue the exception
-        raise e
-    finally:
-        end_progress()
 
-    # Alter marked driver targets
-    if obj.animation_data:
-        for d in obj.animation_data.drivers:
-            for v in d.driver.variables:
-                for target in v.targets:
-                    if target.data_path.startswith("GAMERIG-"):
-                        temp, bone, prop = tuple([x.strip('"]') for x in target.data_path.split('["')])
-                        if bone in obj.data.bones and prop in obj.pose.bones[bone].keys():
-                            target.data_path = target.data_path[8:]
-                        else:
-                            target.data_path = 'pose.bones["%s"]["%s"]' % (basename(bone), prop) #?
-
-    # Get a list of all the bones in the armature
-    bones = [bone.name for bone in obj.data.bones]
-    metabones = [bone.name for bone in metarig.data.bones]
-
-    # All the others make non-deforming.
-    for bone in bones:
-        if not (is_org(bone) or bone in metabones):
-            b = obj.data.bones[bone]
-            b.use_deform = False
-
-    # Reveal all the BoneCollection with control bones on them
-    for col in obj.data.collections:
-        col.is_visible = True
-
-    # Unassign all the bones with names starting with "MCH-" or original bones from any collection.
-    for bone in bones:
-        if is_mch(obj.data.bones[bone].name) or bone in original_bones:
-            for col in obj.data.collections:
-                col.unassign(obj.data.bones[bone])
-
-    # Assign all the bones with names starting with "MCH-" to their bone collection.
-    obj.data.collections.new('MCH')
-    obj.data.collections[-1].is_visible = False
-    for bone in bones:
-        if is_mch(obj.data.bones[bone].name):
+        # Alter marked driver targets
+        if obj.animation_data:
+            for d in obj.animation_data.drivers:
+                for v in d.driver.variables:
+                    for var_target in v.targets:
+                        if var_target.data_path.startswith("GAMERIG-"):
+                            temp, bone, prop = tuple([x.strip('"]') for x in var_target.data_path.split('["')])
+                            if bone in obj.data.bones and prop in obj.pose.bones[bone].keys():
+                                var_target.data_path = var_target.data_path[8:]
+                            else:
+                                var_target.data_path = 'pose.bones["%s"]["%s"]' % (basename(bone), prop) #?
+
+        # Get a list of all the bones in the armature
+        bones = [bone.name for bone in obj.data.bones]
+        metabones = [bone.name for bone in metarig.data.bones]
+
+        # All the others make non-deforming.
+        for bone in bones:
+            if not (is_org(bone) or bone in metabones):
+                b = obj.data.bones[bone]
+                b.use_deform = False
+
+        # Reveal all the BoneCollection with control bones on them
+        for col in obj.data.collections:
+            col.is_visible = True
+
+        # Unassign all the bones with names starting with "MCH-" or original bones from any collection.
+        for bone in bones:
+            if is_mch(obj.data.bones[bone].name) or bone in original_bones:
+                for col in obj.data.collections:
+                    col.unassign(obj.data.bones[bone])
+
+        # Assign all the bones with names starting with "MCH-" to their bone collection.
+        obj.data.collections.new('MCH')
+        obj.data.collections[-1].is_visible = False
+        for bone in bones:
+            if is_mch(obj.data.bones[bone].name):
+                obj.data.collections[-1].assign(obj.data.bones[bone])
+
+        # Assign all the original bones to their bone collection.
+        obj.data.collections.new('ORG')
+        obj.data.collections[-1].is_visible = False
+        for bone in original_bones:
             obj.data.collections[-1].assign(obj.data.bones[bone])
 
-    # Assign all the original bones to their bone collection.
-    obj.data.collections.new('ORG')
-    obj.data.collections[-1].is_visible = False
-    for bone in original_bones:
-        obj.data.collections[-1].assign(obj.data.bones[bone])
+        # Assign shapes to bones
+        assign_all_widgets(obj)
 
-    # Assign shapes to bones
-    assign_all_widgets(obj)
+        # Generate the UI script
+        rig_ui_name = 'gamerig_ui_%s.py' % rig_id
 
-    # Generate the UI script
-    rig_ui_name = 'gamerig_ui_%s.py' % rig_id
+        if rig_ui_name in bpy.data.texts.keys():
+            script = bpy.data.texts[rig_ui_name]
+            try:
+                script.as_module().unregister()
+            except:
+                pass
+            script.clear()
+        else:
+            script = bpy.data.texts.new(rig_ui_name)
 
-    if rig_ui_name in bpy.data.texts.keys():
-        script = bpy.data.texts[rig_ui_name]
-        try:
-            script.as_module().unregister()
-        except:
-            pass
-        script.clear()
-    else:
-        script = bpy.data.texts.new(rig_ui_name)
+        operator_scripts = ''
+        for rigt in rigtypes:
+            try:
+                rigt.operator_script
+            except AttributeError:
+                pass
+            else:
+                operator_scripts += rigt.operator_script(rig_id)
+
+        uitemplate = rig_lists.riguitemplate_dic[metarig.data.gamerig.rig_ui_template]
+
+        script.write(
+            uitemplate[0].format(
+                rig_id=rig_id,
+                operators=operator_scripts,
+                properties=properties_ui(ui_scripts),
+                bone_collections=bone_collections_ui(metarig.data.collections)
+            )
+        )
+        script.use_module = True
 
-    operator_scripts = ''
-    for rigt in rigtypes:
+        print("GameRig: try to register ui script.")
+        # Register UI script
         try:
-            rigt.operator_script
+            script.as_module().register()
         except AttributeError:
             pass
-        else:
-            operator_scripts += rigt.operator_script(rig_id)
-
-    uitemplate = rig_lists.riguitemplate_dic[metarig.data.gamerig.rig_ui_template]
+    
+        t.tick("register ui script done: ")
 
-    script.write(
-        uitemplate[0].format(
-            rig_id=rig_id,
-            operators=operator_scripts,
-            properties=properties_ui(ui_scripts),
-            bone_collections=bone_collections_ui(metarig.data.collections)
-        )
-    )
-    script.use_module = True
+        # Set up bone colors
+        setup_bone_colors(obj, metarig)
 
-    print("GameRig: try to register ui script.")
-    # Register UI script
-    try:
-        script.as_module().register()
-    except AttributeError:
-        pass
-    
-    t.tick("register ui script done: ")
+        # Remove all jig bones.
+        bpy.ops.object.mode_set(mode='EDIT')
+        for bone in [bone.name for bone in obj.data.edit_bones]:
+            if is_jig(bone):
+                obj.data.edit_bones.remove(obj.data.edit_bones[bone])
 
-    # Set up bone colors
-    setup_bone_colors(obj, metarig)
+        #----------------------------------
+        # Deconfigure
+        bpy.ops.object.mode_set(mode='OBJECT')
 
-    # Remove all jig bones.
-    bpy.ops.object.mode_set(mode='EDIT')
-    for bone in [bone.name for bone in obj.data.edit_bones]:
-        if is_jig(bone):
-            obj.data.edit_bones.remove(obj.data.edit_bones[bone])
+        # Remove the constraints and bones doing nothing at runtime
+        if metarig.data.gamerig.optimize:
+            optimizer.optimize(obj, script.as_string())
+            t.tick("Optimize: ")
+
+        # Report dependency cycles, they slow down the playback
+        for line in analysis.describe_cycles(obj, bone_owners):
+            print("GameRig: Warning. " + line)
+            report.append(line)
+
+        # Remember which rig made which bones, for the profiling tools
+        obj.data["gamerig_bone_owners"] = json.dumps({ b : o for b, o in bone_owners.items() if b in obj.data.bones })
+
+        # Back from world orientation into the rig object space
+        if rig_rotation.angle > 0:
+            obj.data.transform(rig_rotation.to_matrix().to_4x4().inverted())
+            for curve in spline_curves(obj):
+                curve.data.transform(rig_rotation.to_matrix().to_4x4().inverted())
+                for m in curve.modifiers:
+                    if m.type == 'HOOK' and m.object == obj:
+                        m.center = obj.data.bones[m.subtarget].head_local
+                        m.matrix_inverse = obj.data.bones[m.subtarget].matrix_local.inverted()
+    except BaseException as e:
+        # Cleanup if something goes wrong or the generation was cancelled (GeneratorExit)
+        print("GameRig: failed to generate rig.")
+        metarig.data.pose_position = rest_backup
+        bpy.ops.object.mode_set(mode='OBJECT')
+        for name in temp_rigs:
+            temp = bpy.data.objects.get(name)
+            if temp is not None and temp != obj:
+                data = temp.data
+                bpy.data.objects.remove(temp)
+                if data.users == 0:
+                    bpy.data.armatures.remove(data)
+        if obj is not None and obj != target:
+            discard_rig(obj)
+        if target:
+            target.select_set(True)
+        view_layer.objects.active = target or metarig
 
-    #----------------------------------
-    # Deconfigure
-    bpy.ops.object.mode_set(mode='OBJECT')
+        # Continue the exception
+        raise e
+    finally:
+        end_progress()
 
-    # Restore original rotation
-
-    if metarig_needs_apply_rot or obj_needs_apply_rot:
-
-        metarig_rotation_euler_inverted = metarig_rotation_euler_backup.copy()
-        metarig_rotation_euler_inverted.x *= -1
-        metarig_rotation_euler_inverted.y *= -1
-        metarig_rotation_euler_inverted.z *= -1
-
-        metarig_rotation_axis_angle_inverted = metarig_rotation_axis_angle_backup.copy()
-        metarig_rotation_axis_angle_inverted.w *= -1
-
-        metarig.rotation_euler      = metarig_rotation_euler_inverted
-        metarig.rotation_quaternion = metarig_rotation_quaternion_backup.inverted()
-        metarig.rotation_axis_angle = metarig_rotation_axis_angle_inverted
-
-        rig_rotation_euler_inverted = rig_rotation_euler_backup.copy()
-        rig_rotation_euler_inverted.x *= -1
-        rig_rotation_euler_inverted.y *= -1
-        rig_rotation_euler_inverted.z *= -1
-
-        rig_rotation_axis_angle_inverted = rig_rotation_axis_angle_backup.copy()
-        rig_rotation_axis_angle_inverted.w *= -1
-
-        obj.rotation_euler      = rig_rotation_euler_inverted
-        obj.rotation_quaternion = rig_rotation_quaternion_backup.inverted()
-        obj.rotation_axis_angle = rig_rotation_axis_angle_inverted
-
-        bpy.ops.object.select_all(action='DESELECT')
-        metarig.select_set(metarig_needs_apply_rot)
-        obj.select_set(obj_needs_apply_rot)
-        bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
-
-    for ob in bpy.data.objects:
-        if ob.parent == obj:
-            for i in range(len(ob.rotation_euler)):
-                if abs(ob.rotation_euler[i]) <= sys.float_info.epsilon:
-                    ob.rotation_euler[i] = 0
-            for i in range(len(ob.rotation_quaternion)):
-                if abs(ob.rotation_quaternion[i]) <= sys.float_info.epsilon:
-                    ob.rotation_quaternion[i] = 0
-            for i in range(len(ob.rotation_axis_angle)):
-                if abs(ob.rotation_axis_angle[i]) <= sys.float_info.epsilon:
-                    ob.rotation_axis_angle[i] = 0
-
-    metarig.rotation_euler      = metarig_rotation_euler_backup
-    metarig.rotation_quaternion = metarig_rotation_quaternion_backup
-    metarig.rotation_axis_angle = metarig_rotation_axis_angle_backup
-
-    obj.rotation_euler      = rig_rotation_euler_backup
-    obj.rotation_quaternion = rig_rotation_quaternion_backup
-    obj.rotation_axis_angle = rig_rotation_axis_angle_backup
-    
     metarig.select_set(False)
     obj.select_set(True)
 
@@ -564,34 +585,138 @@ def generate_rig(context, metarig):
     
     obj.data.pose_position = 'POSE'
 
-    # Restore toggled armature modifiers
-    for i in toggledArmatureModifiers:
-        i.object = obj
-    # Restore parent to bones
-    for child, sub_parent in childs.items():
-        if sub_parent in obj.pose.bones:
-            mat = child.matrix_world.copy()
-            child.parent_bone = sub_parent
-            child.matrix_world = mat
     # Restore active collection
     view_layer.active_layer_collection = layer_collection
 
-    # Restore action and NLA tracks
-    if previous_action:
-        obj.animation_data.action = previous_action
-    if previous_nla_tracks:
+    if error:
+        # Leave the existing rig as it was
+        discard_rig(obj)
+        if target:
+            target.select_set(True)
+            view_layer.objects.active = target
+        else:
+            view_layer.objects.active = metarig
+    elif target:
+        swap_rig(target, obj)
+
+    # Skeleton LODs
+    if not error:
+        for name, lod_obj in lod.build_lods(context, obj, metarig):
+            existing = bpy.data.objects.get(name)
+            if existing and existing.type == 'ARMATURE':
+                swap_rig(existing, lod_obj)
+            else:
+                lod_obj.name = name
+
+    t.tick("The rest: ")
+    for summary in (optimizer.summary(), folded_summary()):
+        if summary:
+            print("GameRig: " + summary)
+    return error
+
+
+def existing_rig(context, metarig):
+    """ The previously generated rig that generating metarig overwrites, or None.
+    """
+    rig_name = get_rig_name(metarig)
+    return next((i for i in context.collection.objects if i != metarig and i.type == 'ARMATURE' and i.name == rig_name), None)
+
+
+def rig_owner_name(rig, bone):
+    return "%s (%s)" % (rig.__class__.__module__.rsplit('.' + RIG_MODULE + '.', 1)[-1], bone)
+
+
+def driver_fcurves(obj):
+    """ Yields (key, fcurve) of the drivers on a rig object and its armature.
+    """
+    for owner in (obj, obj.data):
+        if owner.animation_data:
+            for fcurve in owner.animation_data.drivers:
+                yield (owner == obj, fcurve.data_path, fcurve.array_index), fcurve
+
+
+def folded_summary():
+    """ Returns the report of the driver modifiers folded by the last generation, or None.
+    """
+    if not folded_modifiers:
+        return None
+    return "Folded %d driver modifier(s) into expressions in %d rig(s)" % (sum(folded_modifiers.values()), len(folded_modifiers))
+
+
+def object_rotation(ob):
+    """ Rotation of the object's own (parent relative) transform as a quaternion.
+    """
+    return ob.matrix_basis.decompose()[1]
+
+
+def copy_custom_property(source, dest, prop):
+    """ Copy a custom property value with its UI settings (range, description, ...).
+    """
+    dest[prop] = source[prop]
+    try:
+        dest.id_properties_ui(prop).update(**source.id_properties_ui(prop).as_dict())
+    except TypeError:
+        pass  # property types without UI data (groups, ID pointers)
+
+
+def swap_rig(target, scratch):
+    """ Replace the previously generated rig object by the newly generated one.
+        Everything that uses the old object (armature modifiers, children,
+        constraint and driver targets) is remapped to the new one at once.
+    """
+    name = target.name
+    data = target.data
+    data_name = data.name
+
+    # Take over action and NLA tracks
+    if target.animation_data:
+        anim = scratch.animation_data or scratch.animation_data_create()
+        anim.action = target.animation_data.action
         try:
-            for s in previous_nla_tracks:
-                d = obj.animation_data.nla_tracks.new()
+            for s in target.animation_data.nla_tracks:
+                d = anim.nla_tracks.new()
                 copy_attributes(s, d)
-                for ss in previous_nla_strips[s]:
-                    dd = d.strips.new(ss.name, ss.frame_start, ss.action)
+                for ss in s.strips:
+                    dd = d.strips.new(ss.name, int(ss.frame_start), ss.action)
                     copy_attributes(ss, dd)
         except Exception as e:
             print("GameRig: Warning. failed to restore NLA tracks.")
 
-    t.tick("The rest: ")
-    return error
+    remove_spline_curves(target)
+    target.user_remap(scratch)
+    bpy.data.objects.remove(target)
+    if data.users == 0:
+        bpy.data.armatures.remove(data)
+
+    scratch.name = name
+    scratch.data.name = data_name
+    for curve in spline_curves(scratch):
+        curve.name = curve['gamerig_spline']
+        curve.data.name = curve['gamerig_spline']
+
+
+def spline_curves(rig):
+    """ Curve objects generated along with rig (Spline IK targets), tagged with their intended name.
+    """
+    return [ob for ob in rig.children if ob.type == 'CURVE' and 'gamerig_spline' in ob]
+
+
+def remove_spline_curves(rig):
+    for curve in spline_curves(rig):
+        data = curve.data
+        bpy.data.objects.remove(curve)
+        if data.users == 0:
+            bpy.data.curves.remove(data)
+
+
+def discard_rig(scratch):
+    """ Remove a scratch rig object and its armature.
+    """
+    data = scratch.data
+    remove_spline_curves(scratch)
+    bpy.data.objects.remove(scratch)
+    if data.users == 0:
+        bpy.data.armatures.remove(data)
 
 
 def setup_bone_colors(obj, metarig):
@@ -0,0 +1,249 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+import bpy
+import time
+import traceback
+import sys
+from bpy.app.handlers import persistent
+
+from . import generate
+
+DEBOUNCE_DELAY = 0.3  # Seconds of idle time before regenerating.
+TIME_SLICE = 0.05     # Seconds of generation work per timer call, the UI stays responsive in between.
+
+dirty_rigs = {}        # {metarig name: set of dirty rig (metabone) names}
+last_edit_time = 0.0
+last_generation_time = 0.0
+is_generating = False  # set while a generation step runs, its own updates are not edits
+generation = None      # state of the generation in progress, see start_generation
+
+
+def owning_rig_bone(pbone):
+    """ Returns the name of the metabone which owns the rig the pose bone belongs to.
+    """
+    while pbone:
+        if pbone.gamerig.name:
+            return pbone.name
+        pbone = pbone.parent
+    return None
+
+
+def mark_dirty(metarig, bone_name):
+    """ Mark the rig owning bone_name dirty and (re)start the debounce timer.
+    """
+    global last_edit_time
+    if is_generating or not metarig or metarig.type != 'ARMATURE' or not metarig.data.gamerig.live_preview:
+        return
+
+    pbone = metarig.pose.bones.get(bone_name) if bone_name else None
+    dirty_rigs.setdefault(metarig.name, set()).add(owning_rig_bone(pbone) or '')
+    last_edit_time = time.monotonic()
+
+    if not bpy.app.timers.is_registered(regenerate_dirty_rigs):
+        bpy.app.timers.register(regenerate_dirty_rigs, first_interval=debounce_delay())
+
+
+def debounce_delay():
+    """ Idle time needed before regenerating.
+        Grows with the cost of the last generation, so slow rigs don't keep the UI busy.
+    """
+    return max(DEBOUNCE_DELAY, last_generation_time * 2.0)
+
+
+def find_view3d_override(context):
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                return { 'window' : window, 'screen' : window.screen, 'area' : area }
+    return None
+
+
+def start_generation(context, metarig, override):
+    """ Set up the time sliced regeneration of metarig. Returns False if there is nothing to regenerate.
+    """
+    global generation
+
+    # Live preview only overwrites an already generated rig, found as generate_rig does
+    with context.temp_override(active_object=metarig, object=metarig, **override):
+        if generate.existing_rig(context, metarig) is None:
+            return False
+
+    rigs = dirty_rigs.pop(metarig.name)
+    print("GameRig: live preview regenerate '%s' (dirty rigs: %s)" % (metarig.name, ', '.join(sorted(i for i in rigs if i)) or '-'))
+
+    generation = {
+        'metarig'         : metarig.name,
+        'steps'           : generate.generate_rig_steps(context, metarig),
+        'active'          : context.view_layer.objects.active.name if context.view_layer.objects.active else None,
+        'mode'            : metarig.mode,
+        'active_bone'     : metarig.data.bones.active.name if metarig.data.bones.active else None,
+        'use_global_undo' : context.preferences.edit.use_global_undo,
+        'step_active'     : metarig.name,  # active object the generation left between two slices
+        'time'            : 0.0,
+    }
+    context.preferences.edit.use_global_undo = False
+    return True
+
+
+def run_generation(context, override):
+    """ Run the generation in progress for one time slice. Returns True when it is over.
+    """
+    global is_generating
+    metarig = bpy.data.objects.get(generation['metarig'])
+    steps = generation['steps']
+    if metarig is None:
+        cancel_generation(context, override)
+        return True
+
+    is_generating = True
+    start = time.monotonic()
+    try:
+        with context.temp_override(active_object=metarig, object=metarig, **override):
+            # The generation steps work on the object they left active
+            step_active = generation['step_active']
+            context.view_layer.objects.active = context.view_layer.objects.get(step_active) if step_active else None
+            deadline = start + TIME_SLICE
+            while time.monotonic() < deadline:
+                generate.resume(steps, context)
+            active = context.view_layer.objects.active
+            generation['step_active'] = active.name if active else None
+    except StopIteration as e:
+        if e.value:
+            print("GameRig: live preview failed.\n" + e.value)
+        return True
+    except Exception:
+        print("GameRig: live preview failed.")
+        traceback.print_exc(file=sys.stdout)
+        return True
+    finally:
+        generation['time'] += time.monotonic() - start
+        is_generating = False
+    return False
+
+
+def cancel_generation(context, override):
+    """ Close the generation in progress, which discards its scratch rig.
+    """
+    global is_generating
+    is_generating = True
+    try:
+        with context.temp_override(**override):
+            generation['steps'].close()
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+    finally:
+        is_generating = False
+
+
+def finish_generation(context, override):
+    """ Give the metarig back to the user as it was.
+    """
+    global generation, last_generation_time
+    state, generation = generation, None
+    last_generation_time = state['time']
+    context.preferences.edit.use_global_undo = state['use_global_undo']
+
+    metarig = bpy.data.objects.get(state['metarig'])
+    active = state['active']
+    with context.temp_override(**override):
+        for ob in context.view_layer.objects:
+            ob.select_set(ob.name == active)
+        context.view_layer.objects.active = context.view_layer.objects.get(active) if active else None
+        if metarig and active == metarig.name and state['mode'] not in ('OBJECT', metarig.mode):
+            bpy.ops.object.mode_set(mode=state['mode'])
+    if metarig and state['active_bone'] in metarig.data.bones:
+        metarig.data.bones.active = metarig.data.bones[state['active_bone']]
+
+
+def regenerate_dirty_rigs():
+    """ Timer callback. Returns the delay until the next call, or None when done.
+        The regeneration runs through generate.generate_rig_steps in time
+        slices, one per call, so that the UI stays responsive.
+    """
+    context = bpy.context
+    override = find_view3d_override(context)
+
+    if generation:
+        # Paused while the user edits the metarig, the edits regenerate again afterwards
+        metarig = bpy.data.objects.get(generation['metarig'])
+        if override is None or (metarig and metarig.mode == 'EDIT'):
+            return debounce_delay()
+        if not run_generation(context, override):
+            return 0.0
+        finish_generation(context, override)
+        return debounce_delay() if dirty_rigs else None
+
+    remaining = debounce_delay() - (time.monotonic() - last_edit_time)
+    if remaining > 0:
+        return remaining
+
+    for metarig_name in list(dirty_rigs.keys()):
+        metarig = bpy.data.objects.get(metarig_name)
+        if metarig is None or not metarig.data.gamerig.live_preview:
+            del dirty_rigs[metarig_name]
+            continue
+
+        # Wait for the user to leave edit mode.
+        if metarig.mode == 'EDIT':
+            return debounce_delay()
+
+        if override is None or metarig.name not in context.view_layer.objects:
+            return debounce_delay()
+
+        if start_generation(context, metarig, override):
+            return 0.0
+        del dirty_rigs[metarig_name]
+
+    return None
+
+
+@persistent
+def depsgraph_update_post(scene, depsgraph):
+    """ Track metabone edits of live preview metarigs.
+        Regeneration itself waits until the metarig leaves edit mode.
+    """
+    if is_generating:
+        return
+    for update in depsgraph.updates:
+        ob = update.id.original if isinstance(update.id, bpy.types.Object) else None
+        if ob and ob.type == 'ARMATURE' and ob.mode == 'EDIT' and update.is_updated_geometry \
+           and ob.data.gamerig.rig_ui_template and ob.data.gamerig.live_preview:
+            bone = ob.data.edit_bones.active
+            mark_dirty(ob, bone.name if bone else None)
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
+
+
+def unregister():
+    if depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
+    if bpy.app.timers.is_registered(regenerate_dirty_rigs):
+        bpy.app.timers.unregister(regenerate_dirty_rigs)
+    global generation
+    if generation:
+        try:
+            generation['steps'].close()
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+        generation = None
+    dirty_rigs.clear()
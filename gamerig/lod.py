@@ -0,0 +1,128 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Skeleton LODs : reduced deform armatures following a generated rig.
+"""
+
+import bpy
+import json
+
+from .export import deform_bone_names, deform_parents, build_deform_armature
+from .profiling import bone_owners
+
+LOD_REMAP_PROP = "gamerig_lod_remap"  # armature custom property : {removed bone: surviving bone}
+LOD_LEVEL_PROP = "gamerig_lod"
+
+
+def lod_name(rig_name, level):
+    return "%s_LOD%d" % (rig_name, level)
+
+
+def rig_roots(rig):
+    """ {bone: metarig bone of the rig which made it}.
+        Bones without a recorded owner belong to the rig of their nearest owned ancestor.
+    """
+    owners = bone_owners(rig)
+    roots = {}
+    for bone in rig.data.bones:
+        b = bone
+        while b and b.name not in owners:
+            b = b.parent
+        if b:
+            roots[bone.name] = owners[b.name].rsplit(' (', 1)[-1][:-1]
+    return roots
+
+
+def lod_bones(rig, metarig, level):
+    """ Deform bones of the LOD level.
+        Returns (kept bones, {removed bone: surviving ancestor or None}).
+    """
+    names = deform_bone_names(rig)
+    parents = deform_parents(rig, names)
+    roots = rig_roots(rig)
+
+    removed = set()
+    chains = {}
+    for name in names:
+        root = roots.get(name)
+        if root not in metarig.pose.bones:
+            continue
+        settings = metarig.pose.bones[root].gamerig
+        if 0 < settings.lod_remove_from <= level:
+            removed.add(name)
+        elif settings.lod_keep_every > 1:
+            chains.setdefault(root, []).append(name)
+
+    # Merge chains (spine, tentacle segments) keeping every n-th bone
+    for root, chain in chains.items():
+        keep_every = metarig.pose.bones[root].gamerig.lod_keep_every
+        chain.sort(key=lambda n: len(rig.data.bones[n].parent_recursive))
+        for i, name in enumerate(chain):
+            if i % keep_every != 0:
+                removed.add(name)
+
+    remap = {}
+    for name in removed:
+        parent = parents[name]
+        while parent in removed:
+            parent = parents[parent]
+        remap[name] = parent
+    return [n for n in names if n not in removed], remap
+
+
+def build_lod(context, rig, metarig, level):
+    """ New LOD armature following rig. Must be called in object mode.
+    """
+    kept, remap = lod_bones(rig, metarig, level)
+    obj = build_deform_armature(context, rig, kept, deform_parents(rig, kept), suffix="_LOD%d" % level)
+    for pb in obj.pose.bones:
+        con = pb.constraints.new('COPY_TRANSFORMS')
+        con.target = rig
+        con.subtarget = pb.name
+    obj.data[LOD_LEVEL_PROP] = level
+    obj.data[LOD_REMAP_PROP] = json.dumps(remap)
+    return obj
+
+
+def build_lods(context, rig, metarig):
+    """ Returns [(name, new LOD armature)] of the LOD levels of metarig.
+        Either all the levels are built, or none is left in the scene.
+    """
+    lods = []
+    try:
+        for level in range(1, metarig.data.gamerig.lod_count + 1):
+            lods.append((lod_name(rig.name, level), build_lod(context, rig, metarig, level)))
+    except BaseException:
+        for _, obj in lods:
+            data = obj.data
+            bpy.data.objects.remove(obj)
+            if data.users == 0:
+                bpy.data.armatures.remove(data)
+        raise
+    return lods
+
+
+def lod_remap(obj):
+    """ Bone remap table of a LOD armature, or None.
+    """
+    try:
+        return json.loads(obj.data[LOD_REMAP_PROP])
+    except (KeyError, ValueError):
+        return None
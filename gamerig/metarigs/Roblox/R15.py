@@ -272,23 +272,23 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.L (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel.L"
+        pbone.gamerig.params.footprint_bone = "JIG-heel.L"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.conntact_bone = "ground.L"
+        pbone.gamerig.params.conntact_bone = "ground.L"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     try:
-        pbone.gamerig.support_ik_mode = "root"
+        pbone.gamerig.params.support_ik_mode = "root"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['thigh.R']]
@@ -303,23 +303,23 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.R (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel.R"
+        pbone.gamerig.params.footprint_bone = "JIG-heel.R"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.conntact_bone = "ground.R"
+        pbone.gamerig.params.conntact_bone = "ground.R"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.support_ik_mode = "root"
+        pbone.gamerig.params.support_ik_mode = "root"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['upper_arm.L']]
@@ -334,15 +334,15 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.L (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.support_ik_mode = "root"
+        pbone.gamerig.params.support_ik_mode = "root"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['upper_arm.R']]
@@ -357,15 +357,15 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.R (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.support_ik_mode = "root"
+        pbone.gamerig.params.support_ik_mode = "root"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['head']]
@@ -574,19 +574,19 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.pivot_pos = 2
+        pbone.gamerig.params.pivot_pos = 2
     except AttributeError:
         pass
     try:
-        pbone.gamerig.neck_pos = 5
+        pbone.gamerig.params.neck_pos = 5
     except AttributeError:
         pass
     try:
-        pbone.gamerig.stretchable_tweak = False
+        pbone.gamerig.params.stretchable_tweak = False
     except AttributeError:
         pass
     try:
-        pbone.gamerig.tweak_bone_collection = "Torso (Tweak)"
+        pbone.gamerig.params.tweak_bone_collection = "Torso (Tweak)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['waist']]
@@ -608,11 +608,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.L (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['thigh.R']]
@@ -627,15 +627,15 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.R (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel.R"
+        pbone.gamerig.params.footprint_bone = "JIG-heel.R"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['chest']]
@@ -749,11 +749,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.L (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['upper_arm.R']]
@@ -768,11 +768,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.R (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.allow_ik_stretch = False
+        pbone.gamerig.params.allow_ik_stretch = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['head']]
@@ -787,11 +787,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.primary_bone_collection = "Face (Primary)"
+        pbone.gamerig.params.primary_bone_collection = "Face (Primary)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.secondary_bone_collection = "Face (Secondary)"
+        pbone.gamerig.params.secondary_bone_collection = "Face (Secondary)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['forearm.L']]
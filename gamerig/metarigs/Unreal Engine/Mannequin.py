@@ -622,7 +622,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.widget_plane = "yz"
+        pbone.gamerig.params.widget_plane = "yz"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['pelvis']]
@@ -637,7 +637,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.tweak_bone_collection = "Torso (Tweak)"
+        pbone.gamerig.params.tweak_bone_collection = "Torso (Tweak)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['spine_01']]
@@ -659,11 +659,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel_r"
+        pbone.gamerig.params.footprint_bone = "JIG-heel_r"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.R (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['thigh_l']]
@@ -678,11 +678,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel_l"
+        pbone.gamerig.params.footprint_bone = "JIG-heel_l"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.L (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['spine_02']]
@@ -824,7 +824,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.L (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['head']]
@@ -847,7 +847,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.R (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['lowerarm_l']]
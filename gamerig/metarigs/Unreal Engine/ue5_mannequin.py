@@ -774,7 +774,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.widget_plane = "yz"
+        pbone.gamerig.params.widget_plane = "yz"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['pelvis']]
@@ -789,15 +789,15 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.tweak_bone_collection = "Torso (Tweak)"
+        pbone.gamerig.params.tweak_bone_collection = "Torso (Tweak)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.neck_pos = 7
+        pbone.gamerig.params.neck_pos = 7
     except AttributeError:
         pass
     try:
-        pbone.gamerig.pivot_pos = 2
+        pbone.gamerig.params.pivot_pos = 2
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['spine_01']]
@@ -819,11 +819,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel_r"
+        pbone.gamerig.params.footprint_bone = "JIG-heel_r"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.R (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['thigh_l']]
@@ -838,11 +838,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel_l"
+        pbone.gamerig.params.footprint_bone = "JIG-heel_l"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Leg.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Leg.L (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['spine_02']]
@@ -1026,7 +1026,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.L (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['neck_02']]
@@ -1048,7 +1048,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Arm.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Arm.R (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['lowerarm_l']]
@@ -1514,7 +1514,7 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.tweak_bone_collection = "Torso (Tweak)"
+        pbone.gamerig.params.tweak_bone_collection = "Torso (Tweak)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['tail.001']]
@@ -1529,19 +1529,19 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.chain_length = 6
+        pbone.gamerig.params.chain_length = 6
     except AttributeError:
         pass
     try:
-        pbone.gamerig.stretchable = False
+        pbone.gamerig.params.stretchable = False
     except AttributeError:
         pass
     try:
-        pbone.gamerig.mid_ik_lens = [3, 0, 0, 0]
+        pbone.gamerig.params.mid_ik_lens = [3, 0, 0, 0]
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Tail (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Tail (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['waist']]
@@ -1563,11 +1563,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-f_heel.L"
+        pbone.gamerig.params.footprint_bone = "JIG-f_heel.L"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Hind.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Hind.L (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['thigh.R']]
@@ -1582,11 +1582,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-r_heel.R"
+        pbone.gamerig.params.footprint_bone = "JIG-r_heel.R"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Hind.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Hind.R (FK)"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['tail.002']]
@@ -1725,11 +1725,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Fore.L (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Fore.L (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-f_heel.L"
+        pbone.gamerig.params.footprint_bone = "JIG-f_heel.L"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['upper_arm.R']]
@@ -1744,11 +1744,11 @@ def create(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.fk_bone_collection = "Fore.R (FK)"
+        pbone.gamerig.params.fk_bone_collection = "Fore.R (FK)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-f_heel.R"
+        pbone.gamerig.params.footprint_bone = "JIG-f_heel.R"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['palm.001.L']]
@@ -0,0 +1,273 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Constraint graph optimizer, run on the generated rig after postprocess.
+    Every pass keeps the evaluated pose of the rig unchanged.
+"""
+
+import bpy
+
+from .utils import is_mch
+from .analysis import parse_bone_path, constraint_targets
+
+# Constraint types giving the same result when applied twice in a row
+IDEMPOTENT_TYPES = {
+    'COPY_TRANSFORMS', 'COPY_LOCATION', 'COPY_ROTATION', 'COPY_SCALE',
+    'LIMIT_LOCATION', 'LIMIT_ROTATION', 'LIMIT_SCALE', 'LIMIT_DISTANCE',
+    'DAMPED_TRACK', 'LOCKED_TRACK', 'TRACK_TO',
+}
+
+# Constraint types reading the pose of their target only, not its rest pose
+RELAYABLE_TYPES = {
+    'COPY_TRANSFORMS', 'COPY_LOCATION', 'COPY_ROTATION', 'COPY_SCALE',
+    'DAMPED_TRACK', 'LOCKED_TRACK', 'TRACK_TO', 'STRETCH_TO', 'IK', 'LIMIT_DISTANCE',
+}
+
+# Properties left out when comparing two constraints
+IGNORED_PROPERTIES = {'rna_type', 'name', 'show_expanded', 'active', 'is_valid', 'is_override_data_local', 'error_location', 'error_rotation'}
+
+stats = { 'constraints' : 0, 'merged' : 0, 'bones' : 0 }
+
+
+def reset_stats():
+    for key in stats:
+        stats[key] = 0
+
+
+def summary():
+    """ Returns the report of the last optimization, or None if nothing was optimized.
+    """
+    if not any(stats.values()):
+        return None
+    return "Optimizer: removed %d constraint(s), merged %d constraint(s), collapsed %d relay bone(s)" % (
+        stats['constraints'], stats['merged'], stats['bones']
+    )
+
+
+def driven_constraints(obj):
+    """ {(bone, constraint)} of the constraints having drivers.
+    """
+    driven = set()
+    if obj.animation_data:
+        for fcurve in obj.animation_data.drivers:
+            bone, rest = parse_bone_path(fcurve.data_path)
+            if bone is not None and rest.startswith('.constraints["'):
+                driven.add((bone, rest[len('.constraints["'):].split('"]', 1)[0]))
+    return driven
+
+
+def remove_constraint(obj, pb, con):
+    """ Remove a constraint together with its drivers.
+    """
+    if obj.animation_data:
+        prefix = 'pose.bones["%s"].constraints["%s"]' % (pb.name, con.name)
+        for fcurve in [i for i in obj.animation_data.drivers if i.data_path.startswith(prefix)]:
+            obj.animation_data.drivers.remove(fcurve)
+    pb.constraints.remove(con)
+
+
+def has_effect(con):
+    return not con.mute and con.influence != 0.0 and con.is_valid
+
+
+def replaces_all(con):
+    """ True if con overrides everything the constraints before it did.
+    """
+    return con.type == 'COPY_TRANSFORMS' and con.mix_mode == 'REPLACE' and con.influence == 1.0\
+       and con.owner_space == 'WORLD' and con.target_space == 'WORLD' and con.is_valid and not con.mute
+
+
+def same_settings(a, b):
+    if a.type != b.type:
+        return False
+    for prop in a.bl_rna.properties:
+        if prop.identifier in IGNORED_PROPERTIES or prop.type == 'COLLECTION':
+            continue
+        va = getattr(a, prop.identifier)
+        vb = getattr(b, prop.identifier)
+        if getattr(prop, 'is_array', False):
+            va, vb = tuple(va), tuple(vb)
+        if va != vb:
+            return False
+    return True
+
+
+def is_idempotent(con):
+    if con.type not in IDEMPOTENT_TYPES or con.influence != 1.0:
+        return False
+    if con.type in {'COPY_TRANSFORMS', 'COPY_ROTATION'}:
+        return con.mix_mode == 'REPLACE'
+    if con.type in {'COPY_LOCATION', 'COPY_SCALE'}:
+        return not con.use_offset and not getattr(con, 'use_add', False)
+    return True
+
+
+def remove_dead_constraints(obj):
+    """ Remove the constraints which have no effect : muted, zero influence
+        without drivers, invalid, or overridden by a following full
+        COPY_TRANSFORMS. Returns the count of removed constraints.
+    """
+    driven = driven_constraints(obj)
+    count = 0
+    for pb in obj.pose.bones:
+        constraints = list(pb.constraints)
+        last_replace = -1
+        for i, con in enumerate(constraints):
+            if replaces_all(con) and (pb.name, con.name) not in driven:
+                last_replace = i
+        # IK solvers move the parents of their owner too, they are never dead
+        dead = [con for i, con in enumerate(constraints) if i < last_replace and con.type not in {'IK', 'SPLINE_IK'}]
+        dead += [con for con in constraints[last_replace + 1:] if not has_effect(con) and (pb.name, con.name) not in driven]
+        for con in dead:
+            remove_constraint(obj, pb, con)
+            count += 1
+    return count
+
+
+def merge_duplicate_constraints(obj):
+    """ Remove the second of two adjacent identical idempotent constraints.
+        Returns the count of removed constraints.
+    """
+    driven = driven_constraints(obj)
+    count = 0
+    for pb in obj.pose.bones:
+        constraints = list(pb.constraints)
+        prev = constraints[0] if constraints else None
+        for con in constraints[1:]:
+            if (pb.name, prev.name) not in driven and (pb.name, con.name) not in driven\
+               and is_idempotent(prev) and same_settings(prev, con):
+                remove_constraint(obj, pb, con)
+                count += 1
+            else:
+                prev = con
+    return count
+
+
+def relay_source(obj, pb, driven):
+    """ The bone a pure relay MCH bone copies, or None.
+        A relay has a single full world space COPY_TRANSFORMS and nothing depending on its rest pose.
+    """
+    if not is_mch(pb.name) or len(pb.constraints) != 1 or pb.bone.use_deform or pb.custom_shape:
+        return None
+    con = pb.constraints[0]
+    if not replaces_all(con) or con.target != obj or not con.subtarget or con.head_tail != 0.0:
+        return None
+    if (pb.name, con.name) in driven or pb.bone.children:
+        return None
+    return con.subtarget
+
+
+def relay_users(obj, name):
+    """ Constraints reading bone name, or None if one of them can not be retargeted.
+    """
+    users = []
+    for pb in obj.pose.bones:
+        for con in pb.constraints:
+            if name not in constraint_targets(obj, con):
+                continue
+            if con.type not in RELAYABLE_TYPES or getattr(con, 'target_space', 'WORLD') != 'WORLD' or getattr(con, 'head_tail', 0.0) != 0.0:
+                return None
+            users.append(con)
+    if obj.animation_data:
+        for fcurve in obj.animation_data.drivers:
+            for var in fcurve.driver.variables:
+                for t in var.targets:
+                    if t.id == obj and (t.bone_target == name or parse_bone_path(t.data_path)[0] == name):
+                        return None
+    return users
+
+
+def referenced_bones(obj, text):
+    """ Bones whose names appear quoted in text (e.g. the rig UI script).
+    """
+    return {b.name for b in obj.data.bones if "'%s'" % b.name in text or '"%s"' % b.name in text}
+
+
+def pinned_bones(obj):
+    """ Bones used other than through constraints and drivers : custom shape
+        transforms, custom B-Bone handles, vertex groups deformed by an
+        Armature modifier of obj, and bone parents of other objects.
+        Those uses are not retargeted, so these bones are never collapsed.
+    """
+    pinned = set()
+    for pb in obj.pose.bones:
+        if pb.custom_shape_transform:
+            pinned.add(pb.custom_shape_transform.name)
+    for bone in obj.data.bones:
+        for handle in (bone.bbone_custom_handle_start, bone.bbone_custom_handle_end):
+            if handle:
+                pinned.add(handle.name)
+    for ob in bpy.data.objects:
+        if ob.parent == obj and ob.parent_type == 'BONE':
+            pinned.add(ob.parent_bone)
+        if ob.type != 'MESH':
+            continue
+        if any(mod.type == 'ARMATURE' and mod.object == obj and mod.use_vertex_groups for mod in ob.modifiers):
+            pinned.update(vg.name for vg in ob.vertex_groups)
+    return pinned
+
+
+def collapse_relay_bones(obj, keep=()):
+    """ Retarget the users of pure relay MCH bones to the bones they copy and remove the relays.
+        keep : bones which must not be removed, besides the pinned_bones().
+        Returns the count of removed bones.
+    """
+    driven = driven_constraints(obj)
+    keep = set(keep) | pinned_bones(obj)
+    removed = set()
+    changed = True
+    while changed:
+        changed = False
+        for pb in obj.pose.bones:
+            if pb.name in removed or pb.name in keep:
+                continue
+            source = relay_source(obj, pb, driven)
+            if source is None or source in removed:
+                continue
+            users = relay_users(obj, pb.name)
+            if users is None:
+                continue
+            for con in users:
+                if getattr(con, 'subtarget', '') == pb.name:
+                    con.subtarget = source
+                if getattr(con, 'pole_subtarget', '') == pb.name:
+                    con.pole_subtarget = source
+            pb.constraints.remove(pb.constraints[0])
+            removed.add(pb.name)
+            changed = True
+
+    if removed:
+        mode = obj.mode
+        bpy.ops.object.mode_set(mode='EDIT')
+        for name in removed:
+            obj.data.edit_bones.remove(obj.data.edit_bones[name])
+        bpy.ops.object.mode_set(mode=mode)
+    return len(removed)
+
+
+def optimize(obj, ui_script=''):
+    """ Run all the passes on a generated rig. The rig object must be active.
+        Bones named in ui_script are kept.
+    """
+    reset_stats()
+    stats['constraints'] = remove_dead_constraints(obj)
+    stats['merged'] = merge_duplicate_constraints(obj)
+    stats['bones'] = collapse_relay_bones(obj, referenced_bones(obj, ui_script))
+    return summary()
@@ -0,0 +1,244 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Evaluated pose cache shared by the animation tools (export baking, binary
+    dump, root motion, ...), so that tools running over the same action
+    evaluate each frame once.
+    Entries are keyed by (rig object, armature, action, frame, state). The
+    state holds the update counts of the rig object, of the armature data, of
+    the action and of the IDs the pose depends on (constraint and driver
+    targets, NLA strip actions, parent), and the NLA settings of the rig.
+    Objects sharing an armature datablock have their own entries, their
+    transforms and constraints differ.
+"""
+
+import bpy
+import numpy as np
+from collections import OrderedDict
+from bpy.app.handlers import persistent
+
+MEMORY_BUDGET = 256 * 1024 * 1024  # bytes
+
+entries = OrderedDict()  # {(rig, armature, action, frame, state): (matrix, matrix_basis) float32 arrays}, oldest first
+bone_names = {}          # {(rig, armature revision): [pose bone names]} in entry array order
+revisions = {}           # {ID session uid: update count}
+used = 0
+is_sampling = False      # frame changes of sample() are not edits
+stats = { 'hits' : 0, 'misses' : 0, 'evictions' : 0 }
+
+
+def reset_stats():
+    for key in stats:
+        stats[key] = 0
+
+
+def summary():
+    """ Returns the report of the cache usage since the last reset, or None if unused.
+    """
+    if not stats['hits'] and not stats['misses']:
+        return None
+    return "Pose cache: %d hit(s), %d miss(es), %d eviction(s), %.1f MB used" % (
+        stats['hits'], stats['misses'], stats['evictions'], used / (1024 * 1024)
+    )
+
+
+def uids(rig, action):
+    return rig.session_uid, rig.data.session_uid, action.session_uid if action else 0
+
+
+def current_revision(uid_key):
+    """ Revision of (rig object, armature, action, dependencies...) session uids.
+    """
+    return tuple(revisions.get(uid, 0) for uid in uid_key)
+
+
+def dependencies(rig):
+    """ Session uids of the other IDs the evaluated pose of rig depends on :
+        constraint targets, driver variable targets, NLA strip actions and
+        the parent. Only direct dependencies are listed, the depsgraph
+        reports the IDs updated through them as updated too.
+    """
+    ids = set()
+    for con in list(rig.constraints) + [con for pb in rig.pose.bones for con in pb.constraints]:
+        ids.update(getattr(con, attr, None) for attr in ('target', 'pole_target'))
+        ids.update(t.target for t in getattr(con, 'targets', ()))  # Armature constraint
+    for anim in (rig.animation_data, rig.data.animation_data):
+        if anim:
+            ids.update(t.id for fc in anim.drivers for var in fc.driver.variables for t in var.targets)
+    if rig.animation_data:
+        ids.update(strip.action for track in rig.animation_data.nla_tracks for strip in track.strips)
+    ids.add(rig.parent)
+    ids -= {None, rig, rig.data}
+    return tuple(sorted(i.session_uid for i in ids))
+
+
+def nla_state(rig):
+    """ NLA settings of rig, the NLA tracks are evaluated together with the sampled action.
+    """
+    anim = rig.animation_data
+    if anim is None:
+        return ()
+    return (
+        anim.use_nla, anim.use_tweak_mode, anim.action_blend_type, anim.action_influence, anim.action_extrapolation,
+        tuple((track.mute, track.is_solo, tuple(
+            (strip.mute, strip.action.session_uid if strip.action else 0, strip.frame_start, strip.frame_end,
+             strip.action_frame_start, strip.action_frame_end, strip.scale, strip.repeat, strip.use_reverse,
+             strip.blend_type, strip.extrapolation, strip.influence)
+            for strip in track.strips
+        )) for track in anim.nla_tracks),
+    )
+
+
+def current_state(uid_key, depends):
+    return current_revision(uid_key + depends), depends
+
+
+def clear():
+    global used
+    entries.clear()
+    bone_names.clear()
+    used = 0
+
+
+def invalidate(id_data):
+    """ Drop the entries of an action, armature or rig object (with its armature) changed by a tool.
+    """
+    ids = [id_data, id_data.data] if isinstance(id_data, bpy.types.Object) else [id_data]
+    for i in ids:
+        revisions[i.session_uid] = revisions.get(i.session_uid, 0) + 1
+    evict_stale()
+
+
+def evict_stale():
+    """ Remove the entries of which an ID was updated. An NLA change updates
+        the rig object, so it is evicted through the rig revision.
+    """
+    for key in [k for k in entries if k[4][:2] != current_state(k[:3], k[4][1])]:
+        remove(key)
+
+
+def remove(key):
+    global used
+    used -= sum(a.nbytes for a in entries.pop(key))
+
+
+def store(key, value):
+    global used
+    entries[key] = value
+    used += sum(a.nbytes for a in value)
+    while used > MEMORY_BUDGET and len(entries) > 1:
+        remove(next(iter(entries)))
+        stats['evictions'] += 1
+
+
+def read_pose(rig):
+    """ (bones, 4, 4) row major armature space matrices and basis matrices of the evaluated pose.
+    """
+    count = len(rig.pose.bones)
+    matrix = np.empty(count * 16, dtype=np.float32)
+    basis = np.empty(count * 16, dtype=np.float32)
+    rig.pose.bones.foreach_get('matrix', matrix)
+    rig.pose.bones.foreach_get('matrix_basis', basis)
+    # RNA matrices are stored column major
+    return matrix.reshape(count, 4, 4).transpose(0, 2, 1).copy(), basis.reshape(count, 4, 4).transpose(0, 2, 1).copy()
+
+
+def sample(context, rig, action, frames):
+    """ Evaluated pose of rig playing action on frames.
+        Returns (bone names, (frames, bones, 4, 4) matrices, (frames, bones, 4, 4) basis matrices).
+        Only the frames missing in the cache are evaluated. The active action and the current frame are restored.
+    """
+    global is_sampling
+    scene = context.scene
+    uid_key = uids(rig, action)
+    state = current_state(uid_key, dependencies(rig)) + (nla_state(rig),)
+    keys = [uid_key + (frame, state) for frame in frames]
+    rig_uid = uid_key[0]
+    names_key = (rig_uid, state[0][1])
+    if names_key not in bone_names or len(bone_names[names_key]) != len(rig.pose.bones):
+        bone_names[names_key] = [pb.name for pb in rig.pose.bones]
+        for key in [k for k in entries if k[0] == rig_uid]:
+            remove(key)
+
+    missing = [(key, frame) for key, frame in zip(keys, frames) if key not in entries]
+    stats['hits'] += len(frames) - len(missing)
+    stats['misses'] += len(missing)
+    results = {}
+    if missing:
+        rig.animation_data_create()
+        action_backup = rig.animation_data.action
+        frame_backup = scene.frame_current
+        try:
+            is_sampling = True
+            rig.animation_data.action = action
+            for key, frame in missing:
+                scene.frame_set(frame)
+                results[key] = read_pose(rig)
+                store(key, results[key])
+        finally:
+            rig.animation_data.action = action_backup
+            scene.frame_set(frame_backup)
+            is_sampling = False
+
+    poses = []
+    for key in keys:
+        if key in entries:
+            entries.move_to_end(key)
+            poses.append(entries[key])
+        else:
+            poses.append(results[key])  # evicted while sampling a range larger than the budget
+    if not poses:
+        return bone_names[names_key], np.zeros((0, 0, 4, 4), dtype=np.float32), np.zeros((0, 0, 4, 4), dtype=np.float32)
+    return bone_names[names_key], np.stack([p[0] for p in poses]), np.stack([p[1] for p in poses])
+
+
+@persistent
+def depsgraph_update_post(scene, depsgraph):
+    """ Count the edits of every ID, rigs (unkeyed pose channels, constraints,
+        properties, transforms, NLA), their actions and their dependencies.
+    """
+    if is_sampling:
+        return
+    changed = False
+    for update in depsgraph.updates:
+        uid = update.id.original.session_uid
+        revisions[uid] = revisions.get(uid, 0) + 1
+        changed = True
+    if changed and entries:
+        evict_stale()
+
+
+@persistent
+def load_post(*args):
+    clear()
+    revisions.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
+    bpy.app.handlers.load_post.append(load_post)
+
+
+def unregister():
+    if depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
+    if load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post)
+    clear()
@@ -0,0 +1,254 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Evaluation cost measurement of generated rigs.
+    Shared by the benchmark suite and the profiling operator.
+"""
+
+import bpy
+import json
+import math
+import time
+
+from .utils import is_ctrl
+from .analysis import parse_bone_path
+
+PROFILE_PROP = "gamerig_profile"  # armature custom property keeping the last profile
+
+# Switch property values of the evaluation modes
+MODES = {
+    'FK'  : { 'IK/FK' : 1.0, 'Rig/Phy' : 0.0 },
+    'IK'  : { 'IK/FK' : 0.0, 'Rig/Phy' : 0.0 },
+    'PHY' : { 'Rig/Phy' : 1.0 },
+}
+
+
+def set_switches(obj, values):
+    """ Set switch custom properties (e.g. 'IK/FK', 'Rig/Phy') on every pose bone that has them.
+        Returns the previous values to restore with restore_switches.
+    """
+    previous = []
+    for pb in obj.pose.bones:
+        for prop, value in values.items():
+            if prop in pb.keys():
+                previous.append((pb.name, prop, pb[prop]))
+                pb[prop] = value
+    return previous
+
+
+def restore_switches(obj, previous):
+    for bone, prop, value in previous:
+        obj.pose.bones[bone][prop] = value
+
+
+def add_synthetic_animation(obj, frame_start, frame_end, name="gamerig_benchmark"):
+    """ Key a sine wave on the rotation (and location of unlocked controls) of every control bone.
+        Returns the created action.
+    """
+    action = bpy.data.actions.new(name)
+    obj.animation_data_create()
+    obj.animation_data.action = action
+
+    length = max(frame_end - frame_start, 1)
+    step = max(length // 8, 1)
+    for i, pb in enumerate(pb for pb in obj.pose.bones if is_ctrl(pb.name)):
+        phase = i * 0.7
+        for frame in range(frame_start, frame_end + 1, step):
+            t = (frame - frame_start) / length * 2.0 * math.pi + phase
+            if pb.rotation_mode == 'QUATERNION':
+                pb.rotation_quaternion = (1.0, 0.2 * math.sin(t), 0.2 * math.cos(t), 0.1 * math.sin(2 * t))
+                pb.rotation_quaternion.normalize()
+                pb.keyframe_insert('rotation_quaternion', frame=frame)
+            elif pb.rotation_mode != 'AXIS_ANGLE':
+                pb.rotation_euler = (0.3 * math.sin(t), 0.3 * math.cos(t), 0.15 * math.sin(2 * t))
+                pb.keyframe_insert('rotation_euler', frame=frame)
+            if not any(pb.lock_location):
+                pb.location = (0.02 * math.sin(t), 0.02 * math.cos(t), 0.0)
+                pb.keyframe_insert('location', frame=frame)
+    return action
+
+
+def frame_times(context, frame_start, frame_end, warmup=2):
+    """ Seconds spent evaluating each frame of the range (frame change + depsgraph evaluation).
+    """
+    scene = context.scene
+    for frame in range(frame_start, frame_start + warmup):
+        scene.frame_set(frame)
+    times = []
+    for frame in range(frame_start, frame_end + 1):
+        start = time.perf_counter()
+        scene.frame_set(frame)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times):
+    """ Per frame statistics in milliseconds.
+    """
+    if not times:
+        return {}
+    ordered = sorted(times)
+    count = len(ordered)
+    return {
+        'frames' : count,
+        'mean'   : sum(ordered) / count * 1000.0,
+        'median' : ordered[count // 2] * 1000.0,
+        'p95'    : ordered[min(int(count * 0.95), count - 1)] * 1000.0,
+        'max'    : ordered[-1] * 1000.0,
+    }
+
+
+def measure(context, obj, frame_start, frame_end, switches=None):
+    """ Evaluation statistics of obj over a frame range, with the given switch values.
+    """
+    previous = set_switches(obj, switches or {})
+    try:
+        return summarize(frame_times(context, frame_start, frame_end))
+    finally:
+        restore_switches(obj, previous)
+
+
+def compare(results, baseline, tolerance=0.1):
+    """ Compare mean frame times with a baseline of the same layout.
+        Returns {name: {mode: {'baseline', 'current', 'ratio', 'regressed'}}}.
+    """
+    comparison = {}
+    for name, modes in results.items():
+        for mode, stats in modes.items():
+            base = baseline.get(name, {}).get(mode)
+            if not isinstance(stats, dict) or not isinstance(base, dict) or 'mean' not in stats or 'mean' not in base:
+                continue
+            ratio = stats['mean'] / base['mean'] if base['mean'] > 0 else float('inf')
+            comparison.setdefault(name, {})[mode] = {
+                'baseline'  : base['mean'],
+                'current'   : stats['mean'],
+                'ratio'     : ratio,
+                'regressed' : ratio > 1.0 + tolerance,
+            }
+    return comparison
+
+
+def bone_owners(obj):
+    """ {bone: owner rig} recorded at generation time.
+    """
+    try:
+        return json.loads(obj.data.get("gamerig_bone_owners", "{}"))
+    except ValueError:
+        return {}
+
+
+def bone_groups(obj, grouping='RIG'):
+    """ Groups the bones of obj.
+        grouping : 'RIG' by owning rig, 'MODULE' by owning rig module or
+        'COLLECTION' by bone collection.
+        Returns {group name: set of bone names}.
+    """
+    groups = {}
+    if grouping == 'COLLECTION':
+        for bone in obj.data.bones:
+            for collection in bone.collections:
+                groups.setdefault(collection.name, set()).add(bone.name)
+            if len(bone.collections) == 0:
+                groups.setdefault("(no collection)", set()).add(bone.name)
+    else:
+        owners = bone_owners(obj)
+        for bone in obj.data.bones:
+            owner = owners.get(bone.name, "(unknown)")
+            if grouping == 'MODULE':
+                owner = owner.split(' (', 1)[0]
+            groups.setdefault(owner, set()).add(bone.name)
+    return groups
+
+
+def group_drivers(obj, bones):
+    if not obj.animation_data:
+        return []
+    return [fcurve for fcurve in obj.animation_data.drivers if parse_bone_path(fcurve.data_path)[0] in bones]
+
+
+def mute_group(obj, bones):
+    """ Mute the constraints and drivers of bones. Returns the previous states for unmute_group.
+    """
+    previous = []
+    for name in bones:
+        for con in obj.pose.bones[name].constraints:
+            previous.append((con, con.mute))
+            con.mute = True
+    for fcurve in group_drivers(obj, bones):
+        previous.append((fcurve, fcurve.mute))
+        fcurve.mute = True
+    return previous
+
+
+def unmute_group(previous):
+    for item, mute in previous:
+        item.mute = mute
+
+
+def attribute_cost(context, obj, frame_start, frame_end, grouping='RIG'):
+    """ Evaluation cost of each group of constraints and drivers, measured by
+        muting the group and comparing the mean frame time against the
+        unmuted rig. Returns the profile as a dict, the groups ranked by cost.
+    """
+    scene = context.scene
+    frame_current = scene.frame_current
+    try:
+        total = summarize(frame_times(context, frame_start, frame_end))
+        rows = []
+        for name, bones in bone_groups(obj, grouping).items():
+            constraints = sum(len(obj.pose.bones[b].constraints) for b in bones)
+            drivers = len(group_drivers(obj, bones))
+            if constraints == 0 and drivers == 0:
+                continue
+            previous = mute_group(obj, bones)
+            try:
+                muted = summarize(frame_times(context, frame_start, frame_end))
+            finally:
+                unmute_group(previous)
+            cost = max(total['mean'] - muted['mean'], 0.0)
+            rows.append({
+                'group'       : name,
+                'bones'       : len(bones),
+                'constraints' : constraints,
+                'drivers'     : drivers,
+                'cost'        : cost,
+                'share'       : cost / total['mean'] if total['mean'] > 0 else 0.0,
+            })
+    finally:
+        scene.frame_set(frame_current)
+    rows.sort(key=lambda row: row['cost'], reverse=True)
+    return {
+        'grouping'    : grouping,
+        'frame_start' : frame_start,
+        'frame_end'   : frame_end,
+        'total'       : total,
+        'groups'      : rows,
+    }
+
+
+def store_profile(obj, profile):
+    obj.data[PROFILE_PROP] = json.dumps(profile)
+
+
+def load_profile(obj):
+    try:
+        return json.loads(obj.data.get(PROFILE_PROP, ""))
+    except ValueError:
+        return None
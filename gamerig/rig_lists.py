@@ -92,6 +92,25 @@ def get_collection_list(rig_list):
     return collection_list
 
 
+_category_rig_types = {}
+
+def get_rig_types(category):
+    """ Returns a tuple of the selectable rig types in a category.
+        The result is cached per category and rig list.
+    """
+    key = (category, len(rig_list))
+    if key not in _category_rig_types:
+        _category_rig_types[key] = tuple(
+            r for r in rig_list
+            if r not in implementation_rigs and (
+                category == "All"
+                or r.startswith(category + '.')
+                or (category == "None" and len(r.split('.')) == 1)
+            )
+        )
+    return _category_rig_types[key]
+
+
 # Public variables
 rigs_dict = get_rig_list("")
 rig_list = rigs_dict['rig_list']
@@ -26,7 +26,7 @@ class Rig:
     def __init__(self, obj, bone_name, metabone):
         self.obj = obj
 
-        params = metabone.gamerig
+        params = metabone.gamerig.params
 
         # Abstruct bone name map
         self.abs_name_map = { 'face' : bone_name }
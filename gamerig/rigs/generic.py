@@ -36,7 +36,7 @@ class Rig:
         self.obj      = obj
         self.org_bone = bone
         self.metabone = metabone
-        self.params   = metabone.gamerig
+        self.params   = metabone.gamerig.params
 
     def generate(self, _context):
         """ Generate the rig.
@@ -293,7 +293,7 @@ def create_sample(obj):
     pbone.lock_scale = (False, False, False)
     pbone.rotation_mode = 'QUATERNION'
     try:
-        pbone.gamerig.allow_ik_stretch = True
+        pbone.gamerig.params.allow_ik_stretch = True
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['forearm.L']]
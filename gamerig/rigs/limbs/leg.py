@@ -873,11 +873,11 @@ def create_sample(obj):
     pbone.lock_scale = (False, False, False)
     pbone.rotation_mode = 'QUATERNION'
     try:
-        pbone.gamerig.allow_ik_stretch = True
+        pbone.gamerig.params.allow_ik_stretch = True
     except AttributeError:
         pass
     try:
-        pbone.gamerig.footprint_bone = "JIG-heel.L"
+        pbone.gamerig.params.footprint_bone = "JIG-heel.L"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['shin.L']]
@@ -1,7 +1,7 @@
 import bpy, itertools
 from rna_prop_ui import rna_idprop_ui_create
 from mathutils import Vector
-from ...utils import copy_bone, ctrlname, mchname, insert_before_first_period, find_root_bone, move_bone_collection_to, MetarigError
+from ...utils import copy_bone, generation_matrix, ctrlname, mchname, insert_before_first_period, find_root_bone, move_bone_collection_to, MetarigError
 from ..widgets import create_limb_widget, create_ikarrow_widget, create_ikdir_widget, create_directed_circle_widget
 
 
@@ -9,7 +9,7 @@ class Limb:
     def __init__(self, obj, bone_name, metabone):
         """ Initialize limb rig and key rig properties """
         self.obj       = obj
-        self.params    = metabone.gamerig
+        self.params    = metabone.gamerig.params
 
         self.rot_axis  = self.params.rotation_axis
         self.allow_ik_stretch = self.params.allow_ik_stretch
@@ -788,11 +788,11 @@ class Limb:
         setattr(v, axis, scale)
 
         if reverse:
-            tail_vec = v @ self.obj.matrix_world
+            tail_vec = v @ generation_matrix(self.obj)
             eb.head[:] = eb.tail
             eb.tail[:] = eb.head + tail_vec
         else:
-            tail_vec = v @ self.obj.matrix_world
+            tail_vec = v @ generation_matrix(self.obj)
             eb.tail[:] = eb.head + tail_vec
 
         eb.roll = 0.0
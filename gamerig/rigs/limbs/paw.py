@@ -445,11 +445,11 @@ def create_sample(obj):
     pbone.lock_scale = (False, False, False)
     pbone.rotation_mode = 'QUATERNION'
     try:
-        pbone.gamerig.allow_ik_stretch = True
+        pbone.gamerig.params.allow_ik_stretch = True
     except AttributeError:
         pass
     try:
-        pbone.gamerig.pawstamp_bone = "JIG-forepawstamp.L"
+        pbone.gamerig.params.pawstamp_bone = "JIG-forepawstamp.L"
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['forelimb.02.L']]
@@ -67,7 +67,7 @@ class Rig:
         """ Gather and validate data about the rig.
         """
         self.obj = obj
-        self.params = metabone.gamerig
+        self.params = metabone.gamerig.params
 
         siblings = bone_siblings(obj, bone)
 
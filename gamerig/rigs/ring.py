@@ -8,7 +8,7 @@ class Rig:
 
     def __init__(self, obj, bone_name, metabone):
         self.obj = obj
-        self.params = metabone.gamerig
+        self.params = metabone.gamerig.params
         self.switchable_rig = len(metabone.constraints) > 0
         
         self.org_bones = [bone_name] + connected_children_names(obj, bone_name)
@@ -383,7 +383,7 @@ def create_sample(obj):
     except AttributeError:
         pass
     try:
-        pbone.gamerig.symmetry = False
+        pbone.gamerig.params.symmetry = False
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['Bone.002']]
@@ -31,7 +31,7 @@ class Rig:
         """
         self.obj      = obj
         self.org_bone = bone
-        self.params   = metabone.gamerig
+        self.params   = metabone.gamerig.params
 
     def generate(self, _context):
         """ Generate the rig.
@@ -12,8 +12,9 @@ class Rig:
 
     def __init__(self, obj, bone_name, metabone):
         self.obj = obj
-        self.params = metabone.gamerig
+        self.params = metabone.gamerig.params
         self.switchable_rig = len(metabone.constraints) > 0
+        self.spline = self.params.use_spline_ik and not self.params.fk_only
 
         if self.params.chain_length < 2:
             raise MetarigError(
@@ -49,7 +50,9 @@ class Rig:
 
         ik_ctrl_chain = []
         ik_org_chain = []
-        if not self.params.fk_only:
+        if self.spline:
+            ik_ctrl_chain = self.make_spline_controls()
+        elif not self.params.fk_only:
             cur_ik_len = 0
             for i in self.params.mid_ik_lens:
                 if i > 0:
@@ -93,12 +96,52 @@ class Rig:
 
                 root_ctrls.append( ctrl_bone )
 
+                if self.spline:
+                    eb[ik_ctrl_chain[0]].parent = eb[ctrl_bone]
+
         return (fk_ctrl_chain, ik_ctrl_chain, root_ctrls)
 
 
+    def spline_joints( self ):
+        """ Chain joints (0 : root, len(org_bones) : tip) of the spline controls, evenly spread.
+        """
+        n = len(self.org_bones)
+        count = min(self.params.spline_controls, n + 1)
+        return sorted({ round(i * n / (count - 1)) for i in range(count) })
+
+
+    def make_spline_controls( self ):
+        eb = self.obj.data.edit_bones
+        n = len(self.org_bones)
+
+        ctrls = []
+        for j in self.spline_joints():
+            if j < n:
+                ctrl_bone = copy_bone(self.obj, self.org_bones[j], ctrlname(insert_before_first_period(self.org_bones[j], '_spline')))
+            else:
+                ctrl_bone = copy_bone(self.obj, self.org_bones[-1], ctrlname(insert_before_first_period(self.org_bones[-1], '_spline_tip')))
+                flip_bone(self.obj, ctrl_bone)
+            eb[ctrl_bone].use_connect = False
+            eb[ctrl_bone].length /= 4
+            eb[ctrl_bone].parent = eb[ctrls[0]] if ctrls else eb[self.org_bones[0]].parent
+            ctrls.append( ctrl_bone )
+
+        return ctrls
+
+
     def make_mchs( self ):
         eb = self.obj.data.edit_bones
 
+        if self.spline:
+            # The ORG chain tracks the FK controls and carries the Spline IK itself,
+            # only the tip snapping target is needed
+            mch_bone = copy_bone(self.obj, self.org_bones[-1], mchname(insert_before_first_period(self.org_bones[-1], '_spline_term')))
+            eb[mch_bone].use_connect = False
+            flip_bone(self.obj, mch_bone)
+            eb[mch_bone].length /= 4
+            eb[mch_bone].parent = eb[self.org_bones[-1]]
+            return ([], [mch_bone])
+
         fk_chain = []
         for name in self.org_bones:
             mch_bone = copy_bone(self.obj, name, mchname(insert_before_first_period(name, '_fk')))
@@ -275,26 +318,150 @@ class Rig:
             self.unstash_constraint( org, stashed )
 
             if self.switchable_rig:
-                if not 'Rig/Phy' in pb[fk_ctrls[0]]:
-                    # Create Rig/Physics switch property
-                    pb[fk_ctrls[0]]['Rig/Phy'] = 0.0
-                    rna_idprop_ui_create( pb[fk_ctrls[0]], 'Rig/Phy', default=0.0, description='Rig/Phy Switch', overridable=True )
-                
-                # Add driver to relevant constraint
-                drv = pb[org].constraints[-1].driver_add("influence").driver
-                drv.type = 'AVERAGE'
+                self.make_rig_phy_driver( org, fk_ctrls[0] )
+
+
+    def make_rig_phy_driver( self, org, switch_bone ):
+        pb = self.obj.pose.bones
+
+        if not 'Rig/Phy' in pb[switch_bone]:
+            # Create Rig/Physics switch property
+            pb[switch_bone]['Rig/Phy'] = 0.0
+            rna_idprop_ui_create( pb[switch_bone], 'Rig/Phy', default=0.0, description='Rig/Phy Switch', overridable=True )
+
+        # Add driver to relevant constraint
+        drv = pb[org].constraints[-1].driver_add("influence").driver
+        drv.type = 'AVERAGE'
+
+        var = drv.variables.new()
+        var.name = 'rig_phy_switch'
+        var.type = "SINGLE_PROP"
+        var.targets[0].id = self.obj
+        var.targets[0].data_path = pb[switch_bone].path_from_id() + '["Rig/Phy"]'
+
+        drv_modifier = self.obj.animation_data.drivers[-1].modifiers.new('GENERATOR')
+        drv_modifier.mode            = 'POLYNOMIAL'
+        drv_modifier.poly_order      = 1
+        drv_modifier.coefficients[0] = 0.0
+        drv_modifier.coefficients[1] = 1.0
+
+
+    def make_spline_curve( self, ctrls ):
+        """ Bezier curve through the spline controls, each point hooked to its control.
+            The curve is a child of the rig, replaced along with it (see generate.swap_rig).
+        """
+        name = 'spline_%s_%s' % (self.obj.data['gamerig_id'], self.org_bones[0])
+
+        bones = self.obj.data.bones
+        points = [bones[ctrl].head_local for ctrl in ctrls]
+
+        data = bpy.data.curves.new(name, 'CURVE')
+        data.dimensions = '3D'
+        spline = data.splines.new('BEZIER')
+        spline.bezier_points.add(len(points) - 1)
+        for i, point in enumerate(spline.bezier_points):
+            # Catmull-Rom like tangents
+            prev = points[max(i - 1, 0)]
+            next = points[min(i + 1, len(points) - 1)]
+            tangent = (next - prev) / (6 if 0 < i < len(points) - 1 else 3)
+            point.handle_left_type = point.handle_right_type = 'ALIGNED'
+            point.co = points[i]
+            point.handle_left = points[i] - tangent
+            point.handle_right = points[i] + tangent
+
+        curve = bpy.data.objects.new(name, data)
+        curve['gamerig_spline'] = name
+        for collection in self.obj.users_collection:
+            collection.objects.link(curve)
+        curve.parent = self.obj
+        curve.hide_render = True
+        curve.hide_set(True)
+
+        for i, ctrl in enumerate(ctrls):
+            hook = curve.modifiers.new(ctrl, 'HOOK')
+            hook.object = self.obj
+            hook.subtarget = ctrl
+            hook.center = bones[ctrl].head_local
+            hook.matrix_inverse = bones[ctrl].matrix_local.inverted()
+            hook.vertex_indices_set([i * 3, i * 3 + 1, i * 3 + 2])  # left handle, point, right handle
+
+        return curve
+
+
+    def make_spline_constraints( self, context, all_bones ):
+        """ Spline IK mode : the ORG chain tracks the FK controls, and one Spline IK
+            constraint on its last bone, blended by the IK/FK switch, follows the curve.
+        """
+        org_bones = self.org_bones
+        pb        = self.obj.pose.bones
+        fk_ctrls   = all_bones['fk_ctrls']
+        root_ctrls = all_bones['root_ctrls']
+        curve = self.make_spline_curve(all_bones['ik_ctrls'])
+
+        for org, ctrl in zip( org_bones, fk_ctrls ):
+            stashed = self.stash_constraint(org)
+
+            if self.params.add_root_controller and org == org_bones[0]:
+                self.make_constraint( org, {
+                    'constraint'  : 'COPY_TRANSFORMS',
+                    'subtarget'   : root_ctrls[0],
+                })
+
+            self.make_constraint( org, {
+                'constraint'  : 'DAMPED_TRACK',
+                'subtarget'   : ctrl,
+            })
+
+            if self.params.stretchable:
+                self.make_constraint( org, {
+                    'constraint'  : 'STRETCH_TO',
+                    'subtarget'   : ctrl,
+                })
+
+            if org == org_bones[-1]:
+                self.make_constraint( org, {
+                    'constraint'       : 'SPLINE_IK',
+                    'chain_count'      : len(org_bones),
+                    'use_curve_radius' : False,
+                    'y_scale_mode'     : 'FIT_CURVE' if self.params.stretchable else 'BONE_ORIGINAL',
+                    'xz_scale_mode'    : 'VOLUME_PRESERVE' if self.params.stretchable else 'NONE',
+                })
+                con = pb[org].constraints[-1]
+                con.target = curve
+
+                # IK/FK (and Rig/Phy) switch
+                drv = con.driver_add("influence").driver
+                drv.type = 'SCRIPTED'
 
                 var = drv.variables.new()
-                var.name = 'rig_phy_switch'
+                var.name = 'ik_fk_switch'
                 var.type = "SINGLE_PROP"
                 var.targets[0].id = self.obj
-                var.targets[0].data_path = pb[fk_ctrls[0]].path_from_id() + '["Rig/Phy"]'
+                var.targets[0].data_path = pb[fk_ctrls[0]].path_from_id() + '["IK/FK"]'
+                drv.expression = '1 - ik_fk_switch'
+
+                if self.switchable_rig:
+                    var = drv.variables.new()
+                    var.name = 'rig_phy_switch'
+                    var.type = "SINGLE_PROP"
+                    var.targets[0].id = self.obj
+                    var.targets[0].data_path = pb[fk_ctrls[0]].path_from_id() + '["Rig/Phy"]'
+                    drv.expression = '(1 - ik_fk_switch) * (1 - rig_phy_switch)'
+
+                if self.params.stretchable:
+                    drv = con.driver_add("bulge").driver
+                    drv.type = 'AVERAGE'
+
+                    var = drv.variables.new()
+                    var.name = 'maintain_volume'
+                    var.type = "SINGLE_PROP"
+                    var.targets[0].id = self.obj
+                    var.targets[0].data_path = pb[fk_ctrls[0]].path_from_id() + '["Maintain Volume"]'
 
-                drv_modifier = self.obj.animation_data.drivers[-1].modifiers.new('GENERATOR')
-                drv_modifier.mode            = 'POLYNOMIAL'
-                drv_modifier.poly_order      = 1
-                drv_modifier.coefficients[0] = 0.0
-                drv_modifier.coefficients[1] = 1.0
+            self.unstash_constraint( org, stashed )
+
+            if self.switchable_rig:
+                self.make_rig_phy_driver( org, fk_ctrls[0] )
 
 
     def stash_constraint( self, bone ):
@@ -356,6 +523,9 @@ class Rig:
         self.ctrls  = self.make_controls()
         self.mchs  = self.make_mchs()
 
+        if self.spline:
+            return self.spline_ui_script()
+
         ik_fk_snap_target = []
         cur_ik_len = 0
         for i in self.params.mid_ik_lens:
@@ -399,6 +569,26 @@ if is_selected( controls ):
     props.targets  = "{self.org_bones[1:]}"
 """ if self.switchable_rig else '')
 
+    def spline_ui_script(self):
+        ik_fk_snap_target = [self.org_bones[j] for j in self.spline_joints()[:-1]] + self.mchs[1]
+        return f"""
+controls = {self.ctrls[0] + self.ctrls[1] + self.ctrls[2]}
+
+if is_selected( controls ):
+    layout.prop( pose_bones[ controls[0] ], '["IK/FK"]', text='IK/FK ({self.org_bones[0]})', slider = True )
+""" + (f"""
+    layout.prop( pose_bones[ controls[0] ], '["Maintain Volume"]', text='Maintain Volume ({self.org_bones[0]})', slider = True )
+""" if self.params.stretchable else '') + (f"""
+    layout.prop( pose_bones[ controls[0] ], '["Rig/Phy"]', text='Rig/Phy ({self.org_bones[0]})', slider = True )
+""" if self.switchable_rig else '') + f"""
+    props = layout.operator(Tentacle_FK2Target.bl_idname, text="Snap FK->IK ({self.org_bones[0]})", icon='SNAP_ON')
+    props.fk_ctrls = "{self.ctrls[0]}"
+    props.targets  = "{self.org_bones[1:]}"
+    props = layout.operator(Tentacle_IK2FK.bl_idname, text="Snap IK->FK ({self.org_bones[0]})", icon='SNAP_ON')
+    props.ik_ctrls = "{self.ctrls[1]}"
+    props.fk_chain = "{ik_fk_snap_target}"
+"""
+
     def postprocess(self, context):
         pb = self.obj.pose.bones
 
@@ -432,7 +622,10 @@ if is_selected( controls ):
             'ik_chain'   : self.mchs[1],
         }
 
-        self.make_constraints(context, all_bones)
+        if self.spline:
+            self.make_spline_constraints(context, all_bones)
+        else:
+            self.make_constraints(context, all_bones)
 
 
 def operator_script(rig_id):
@@ -593,6 +786,19 @@ def add_parameters(params):
         description = "Don't make IK controllers."
     )
 
+    params.use_spline_ik = bpy.props.BoolProperty(
+        name        = "Spline IK",
+        default     = False,
+        description = "IK with a single Spline IK constraint following a curve hooked to a few controls, instead of an IK chain. Cheaper on long chains"
+    )
+
+    params.spline_controls = bpy.props.IntProperty(
+        name        = "Spline Controls",
+        default     = 4,
+        min         = 2,
+        description = "Number of controls of the Spline IK curve"
+    )
+
     params.add_root_controller = bpy.props.BoolProperty(
         name        = "Add Root Controller",
         default     = False,
@@ -614,7 +820,12 @@ def parameters_ui(layout, params):
     r.prop(params, "chain_length")
 
     r = layout.row()
-    r.prop(params, "mid_ik_lens")
+    r.prop(params, "use_spline_ik")
+    if params.use_spline_ik:
+        r.prop(params, "spline_controls")
+    else:
+        r = layout.row()
+        r.prop(params, "mid_ik_lens")
     
     r = layout.row()
     r.prop(params, "stretchable")
@@ -667,11 +878,11 @@ def create_sample(obj):
     pbone.lock_scale = (False, False, False)
     pbone.rotation_mode = 'QUATERNION'
     try:
-        pbone.gamerig.chain_length = 3
+        pbone.gamerig.params.chain_length = 3
     except AttributeError:
         pass
     try:
-        pbone.gamerig.stretchable = True
+        pbone.gamerig.params.stretchable = True
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['Bone.001']]
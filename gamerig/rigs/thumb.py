@@ -15,7 +15,7 @@ class Rig:
     def __init__(self, obj, bone_name, metabone):
         self.obj = obj
         self.org_bones = [bone_name] + connected_children_names(obj, bone_name)
-        self.params = metabone.gamerig
+        self.params = metabone.gamerig.params
 
         if len(self.org_bones) <= 2:
             raise MetarigError("GAMERIG ERROR: Bone '%s': listen bro, that finger rig jusaint put tugetha rite. A little hint, use more than one bone!!" % (basename(bone_name)))
@@ -2,7 +2,7 @@ import bpy
 from mathutils import Vector
 from rna_prop_ui import rna_idprop_ui_create
 from ..utils import (
-    copy_bone, put_bone,
+    copy_bone, put_bone, generation_matrix,
     ctrlname, basename, mchname, connected_children_names,
     create_widget, move_bone_collection_to,
     MetarigError
@@ -19,7 +19,7 @@ class Rig:
 
         self.obj          = obj
         self.org_bones    = [bone_name] + connected_children_names(obj, bone_name)
-        self.params       = metabone.gamerig
+        self.params       = metabone.gamerig.params
         self.spine_length = sum( [ eb[b].length for b in self.org_bones ] )
 
         self.root_bone_parent = eb[ self.org_bones[0] ].parent.name if eb[ self.org_bones[0] ].parent else None
@@ -83,11 +83,11 @@ class Rig:
         setattr(v,axis,scale)
 
         if reverse:
-            tail_vec = v @ self.obj.matrix_world
+            tail_vec = v @ generation_matrix(self.obj)
             eb.head[:] = eb.tail
             eb.tail[:] = eb.head + tail_vec
         else:
-            tail_vec = v @ self.obj.matrix_world
+            tail_vec = v @ generation_matrix(self.obj)
             eb.tail[:] = eb.head + tail_vec
 
 
@@ -900,23 +900,23 @@ def create_sample(obj):
     pbone.rotation_mode = 'QUATERNION'
     arm.collections["Face"].assign(pbone)
     try:
-        pbone.gamerig.pivot_pos = 2
+        pbone.gamerig.params.pivot_pos = 2
     except AttributeError:
         pass
     try:
-        pbone.gamerig.neck_pos = 5
+        pbone.gamerig.params.neck_pos = 5
     except AttributeError:
         pass
     try:
-        pbone.gamerig.stretchable_tweak = True
+        pbone.gamerig.params.stretchable_tweak = True
     except AttributeError:
         pass
     try:
-        pbone.gamerig.tweak_bone_collection = "Torso (Tweak)"
+        pbone.gamerig.params.tweak_bone_collection = "Torso (Tweak)"
     except AttributeError:
         pass
     try:
-        pbone.gamerig.chain_bone_controls = ""
+        pbone.gamerig.params.chain_bone_controls = ""
     except AttributeError:
         pass
     pbone = obj.pose.bones[bones['waist']]
@@ -23,6 +23,7 @@ UI_TEMPLATE = '''
 # for gamerig
 #
 import bpy
+import json
 from mathutils import Matrix, Vector
 from math import acos, pi, radians, floor
 
@@ -183,6 +184,130 @@ def match_pole_direction(context, pb_ik_pole, pb_fk_chain1, pb_fk_chain2, pb_fk_
 
 classes = []
 
+#########################
+## Rig part evaluation ##
+#########################
+
+def rig_parts(obj):
+    # {{rig part: [bones]}} from the bone owners recorded at generation
+    try:
+        owners = json.loads(obj.data['gamerig_bone_owners'])
+    except (KeyError, ValueError):
+        return {{}}
+    parts = {{}}
+    for bone, owner in owners.items():
+        if bone in obj.pose.bones:
+            parts.setdefault(owner, []).append(bone)
+    return parts
+
+
+def disabled_parts(obj):
+    # {{rig part: what was muted to disable it}}
+    try:
+        return json.loads(obj.data['gamerig_parts_state'])
+    except (KeyError, ValueError):
+        return {{}}
+
+
+def set_part_evaluation(obj, part, bones, enable):
+    state = disabled_parts(obj)
+    if enable == (part not in state):
+        return
+    if enable:
+        muted = state.pop(part)
+        for bone, con in muted['constraints']:
+            if bone in obj.pose.bones and con in obj.pose.bones[bone].constraints:
+                obj.pose.bones[bone].constraints[con].mute = False
+        if obj.animation_data:
+            for path, index in muted['drivers']:
+                fcurve = obj.animation_data.drivers.find(path, index=index)
+                if fcurve:
+                    fcurve.mute = False
+        for bone in muted['posed']:
+            if bone in obj.pose.bones:
+                obj.pose.bones[bone].matrix_basis = Matrix()
+    else:
+        # The constrained ORG bones keep the pose they have now
+        posed = {{}}
+        for name in bones:
+            pb = obj.pose.bones[name]
+            if not name.startswith(('c.', 'MCH-')) and pb.constraints:
+                posed[name] = obj.convert_space(pose_bone=pb, matrix=pb.matrix, from_space='POSE', to_space='LOCAL')
+        for name, matrix in posed.items():
+            obj.pose.bones[name].matrix_basis = matrix
+
+        constraints = []
+        for name in bones:
+            for con in obj.pose.bones[name].constraints:
+                if not con.mute:
+                    con.mute = True
+                    constraints.append([name, con.name])
+        drivers = []
+        if obj.animation_data:
+            names = set(bones)
+            for fcurve in obj.animation_data.drivers:
+                path = fcurve.data_path
+                if path.startswith('pose.bones["') and path[12:].split('"]', 1)[0] in names and not fcurve.mute:
+                    fcurve.mute = True
+                    drivers.append([path, fcurve.array_index])
+        state[part] = {{ 'constraints' : constraints, 'drivers' : drivers, 'posed' : list(posed) }}
+    obj.data['gamerig_parts_state'] = json.dumps(state)
+
+
+class RigPart_SetEvaluation(bpy.types.Operator):
+    """ Enable or disable the evaluation of a rig part.
+    """
+    bl_idname = "gamerig.rig_part_evaluation_{rig_id}"
+    bl_label = "Rig Part Evaluation"
+    bl_description = "Toggle the constraints and drivers of this rig part. A disabled part keeps its current pose"
+    bl_options = {{'UNDO', 'INTERNAL'}}
+
+    part   : bpy.props.StringProperty(name="Part")
+    enable : bpy.props.BoolProperty(name="Enable")
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.mode in ('POSE', 'OBJECT')
+
+    def execute(self, context):
+        obj = context.active_object
+        set_part_evaluation(obj, self.part, rig_parts(obj).get(self.part, []), self.enable)
+        return {{'FINISHED'}}
+
+classes.append(RigPart_SetEvaluation)
+
+
+class RigPart_PlaybackMode(bpy.types.Operator):
+    """ Evaluate only the rig parts of the selected bones, or every part again.
+    """
+    bl_idname = "gamerig.rig_part_playback_mode_{rig_id}"
+    bl_label = "Playback Mode"
+    bl_description = "Disable every rig part except the ones owning the selected bones"
+    bl_options = {{'UNDO', 'INTERNAL'}}
+
+    enable_all : bpy.props.BoolProperty(name="Enable All")
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.mode in ('POSE', 'OBJECT')
+
+    def execute(self, context):
+        obj = context.active_object
+        parts = rig_parts(obj)
+        if self.enable_all:
+            keep = set(parts)
+        else:
+            selected = {{pb.name for pb in context.selected_pose_bones or []}}
+            keep = {{part for part, bones in parts.items() if selected.intersection(bones)}}
+            if not keep:
+                self.report({{'WARNING'}}, "Select bones of the rig parts to keep.")
+                return {{'CANCELLED'}}
+        for part, bones in parts.items():
+            set_part_evaluation(obj, part, bones, part in keep)
+        return {{'FINISHED'}}
+
+classes.append(RigPart_PlaybackMode)
+
 ###########################
 ## Rig special operators ##
 ###########################
@@ -231,6 +356,39 @@ class PropertiesPanel(bpy.types.Panel):
 
 classes.append(PropertiesPanel)
 
+class RigPartsPanel(bpy.types.Panel):
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Item'
+    bl_label = 'GameRig Rig Parts'
+    bl_idname = 'GAMERIG_PT_rig_parts_{rig_id}'
+    bl_options = {{'DEFAULT_CLOSED'}}
+
+    @classmethod
+    def poll(self, context):
+        if context.mode not in ('POSE', 'OBJECT'):
+            return False
+        try:
+            return context.object.data['gamerig_id'] == '{rig_id}'
+        except (AttributeError, KeyError, TypeError):
+            return False
+
+    def draw(self, context):
+        layout = self.layout
+        obj = context.object
+        state = disabled_parts(obj)
+        row = layout.row(align=True)
+        row.operator(RigPart_PlaybackMode.bl_idname, text="Playback Mode", icon='PLAY').enable_all = False
+        row.operator(RigPart_PlaybackMode.bl_idname, text="Evaluate All", icon='FILE_REFRESH').enable_all = True
+        col = layout.column(align=True)
+        for part in sorted(rig_parts(obj)):
+            enabled = part not in state
+            op = col.operator(RigPart_SetEvaluation.bl_idname, text=part, icon='CHECKBOX_HLT' if enabled else 'CHECKBOX_DEHLT', depress=enabled)
+            op.part = part
+            op.enable = not enabled
+
+classes.append(RigPartsPanel)
+
 class BoneCollectionsPanel(bpy.types.Panel):
     bl_idname = 'GAMERIG_PT_bone_collections_{rig_id}'
     bl_space_type = 'PROPERTIES'
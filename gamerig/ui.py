@@ -19,12 +19,18 @@
 # <pep8 compliant>
 
 import bpy
-from bpy.props import IntProperty, EnumProperty, StringProperty
+from bpy.props import IntProperty, FloatProperty, BoolProperty, EnumProperty, StringProperty
 from mathutils import Color
+import os
 import re
+import math
+import time
 
-from .utils import get_rig_type, write_metarig, write_widget, unique_name, get_rig_name
-from . import rig_lists, generate
+from .utils import (
+    find_rig_type, write_metarig, write_widget, unique_name, get_rig_name, legacy_parameter_keys,
+    estimate_remaining_time
+)
+from . import rig_lists, generate, optimizer, profiling, export, lod, weights, animation, pose_cache
 
 
 class ArmaturePanel(bpy.types.Panel):
@@ -109,6 +115,9 @@ class ArmaturePanel(bpy.types.Panel):
             if target:
                 layout.row().box().label(text="Overwrite to '%s'" % target.name, icon='INFO')
                 layout.row().operator(GenerateOperator.bl_idname, text="Regenerate Rig", icon='POSE_HLT')
+                layout.row().prop(armature.gamerig, "live_preview")
+                layout.row().prop(armature.gamerig, "optimize")
+                layout.row().prop(armature.gamerig, "lod_count")
                 if obj.mode == 'OBJECT':
                     layout.separator()
                     row = layout.row(align=True).split(factor=0.06)
@@ -119,6 +128,8 @@ class ArmaturePanel(bpy.types.Panel):
                 rig_name = unique_name(bpy.data.objects.keys(), rig_name)
                 layout.row().box().label(text="Create new armature '%s'" % rig_name, icon='INFO')
                 layout.row().operator(GenerateOperator.bl_idname, text="Generate New Rig", icon='POSE_HLT')
+                layout.row().prop(armature.gamerig, "optimize")
+                layout.row().prop(armature.gamerig, "lod_count")
 
 
 class AddBoneGroupsOperator(bpy.types.Operator):
@@ -377,6 +388,17 @@ class BoneGroupsSpecialsMenu(bpy.types.Menu):
         layout.operator(RemoveAllBoneGroupOperator.bl_idname)
 
 
+def update_rig_types(gparam, _context=None):
+    """ Rebuild the rig type list used by BonePanel for the current category.
+    """
+    category_name = str(gparam.category).replace(" ", "")
+    gparam.types.clear()
+    for r in rig_lists.get_rig_types(category_name):
+        a = gparam.types.add()
+        a.name = r
+    gparam.types_category = category_name
+
+
 class BonePanel(bpy.types.Panel):
     bl_idname      = "GAMERIG_PT_rig_type"
     bl_label       = "GameRig Rig Type"
@@ -396,24 +418,15 @@ class BonePanel(bpy.types.Panel):
 
         layout = self.layout
 
-        # Build types list
-        for i in range(0, len(gparam.types)):
-            gparam.types.remove(0)
+        if legacy_parameter_keys(bone):
+            layout.label(text='This metarig armature has old format rig parameters.', icon='ERROR')
+            layout.operator(MigrateOperator.bl_idname)
+            return
+
+        # Build types list (only when the category or the rig list has changed)
+        if gparam.types_category != category_name or len(gparam.types) != len(rig_lists.get_rig_types(category_name)):
+            update_rig_types(gparam)
 
-        for r in rig_lists.rig_list:
-            if r in rig_lists.implementation_rigs:
-                continue
-            # collection = r.split('.')[0]  # UNUSED
-            if category_name == "All":
-                a = gparam.types.add()
-                a.name = r
-            elif r.startswith(category_name + '.'):
-                a = gparam.types.add()
-                a.name = r
-            elif category_name == "None" and len(r.split('.')) == 1:
-                a = gparam.types.add()
-                a.name = r
-        
         # Rig category field
         row = layout.row()
         row.prop(gparam, 'category', text="Category")
@@ -425,7 +438,7 @@ class BonePanel(bpy.types.Panel):
         # Rig type parameters / Rig type non-exist alert
         if rig_name != "":
             try:
-                rig = get_rig_type(rig_name)
+                rig = find_rig_type(rig_name)
                 rig.Rig
             except (ImportError, AttributeError):
                 row = layout.row()
@@ -441,7 +454,14 @@ class BonePanel(bpy.types.Panel):
                     col = layout.column()
                     col.label(text="Options:")
                     box = layout.box()
-                    rig.parameters_ui(box, bone.gamerig)
+                    rig.parameters_ui(box, bone.gamerig.params)
+
+                if context.object.data.gamerig.lod_count > 0:
+                    col = layout.column()
+                    col.label(text="LOD:")
+                    box = layout.box()
+                    box.row().prop(bone.gamerig, "lod_remove_from")
+                    box.row().prop(bone.gamerig, "lod_keep_every")
 
 
 class DevToolsPanel(bpy.types.Panel):
@@ -505,60 +525,533 @@ class RevealUnlinkedWidgetOperator(bpy.types.Operator):
         return {'FINISHED'}
 
 
-class GenerateProgressOperator(bpy.types.Operator):
-    bl_idname = "gamerig.show_generation_progress"
-    bl_label = 'Rig Generation Progress'
-    bl_options = {'REGISTER'}  
+class ProfileRigOperator(bpy.types.Operator):
+    """Measure the evaluation cost of the generated rig parts.
+    """
+    bl_idname = "gamerig.profile_rig"
+    bl_label = "Profile Rig"
+    bl_description = "Measure the playback cost of each rig part by muting its constraints and drivers one group at a time"
 
-    def modal(self, context, event):
-        wm = context.window_manager
-        print(self.ticks, wm.gamerig.progress_indicator)
-        if event.type == 'TIMER':
-            self.ticks += 1
-        if self.ticks > 9:
-            wm.gamerig.progress_indicator = 101 # done
-            wm.event_timer_remove(self.timer)
-            print('done')
+    grouping : EnumProperty(
+        name="Group By",
+        items=(
+            ('RIG', "Rig", "Group by owning rig"),
+            ('MODULE', "Rig Type", "Group by owning rig type"),
+            ('COLLECTION', "Bone Collection", "Group by bone collection"),
+        ),
+        default='RIG'
+    ) # type: ignore
+
+    frame_start : IntProperty(name="Start Frame", default=1, min=0) # type: ignore
+    frame_end : IntProperty(name="End Frame", default=60, min=0) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'ARMATURE' and 'gamerig_id' in context.object.data\
+          and context.mode in ('OBJECT', 'POSE')
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        obj = context.object
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR'}, "End frame is before start frame.")
             return {'CANCELLED'}
-  
-        wm.gamerig.progress_indicator = self.ticks*10
-  
+        profile = profiling.attribute_cost(context, obj, self.frame_start, self.frame_end, self.grouping)
+        profiling.store_profile(obj, profile)
+        self.report({'INFO'}, "Rig evaluation %.3f ms/frame, %d group(s) profiled." % (profile['total']['mean'], len(profile['groups'])))
+        return {'FINISHED'}
+
+
+class ProfilePanel(bpy.types.Panel):
+    bl_idname = "GAMERIG_PT_profile"
+    bl_space_type  = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_label       = "GameRig Profile"
+    bl_category = "Tool"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    max_rows = 20
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'ARMATURE' and 'gamerig_id' in context.object.data\
+          and context.mode in ('OBJECT', 'POSE')
+
+    def draw(self, context):
+        layout = self.layout
+        layout.operator(ProfileRigOperator.bl_idname, icon='TIME')
+        profile = profiling.load_profile(context.object)
+        if not profile:
+            return
+        layout.label(text="Frames %d - %d : %.3f ms/frame" % (profile['frame_start'], profile['frame_end'], profile['total']['mean']))
+        col = layout.column(align=True)
+        for row in profile['groups'][:self.max_rows]:
+            r = col.row(align=True)
+            r.label(text=row['group'])
+            r.label(text="%.3f ms (%.0f%%)" % (row['cost'], row['share'] * 100.0))
+        if len(profile['groups']) > self.max_rows:
+            col.label(text="... %d more" % (len(profile['groups']) - self.max_rows))
+
+
+class GameExportOperator(bpy.types.Operator):
+    """Export a deform-only armature with the rig actions baked onto it.
+    """
+    bl_idname = "gamerig.game_export"
+    bl_label = "Game Export"
+    bl_description = "Bake the actions onto a deform-only copy of the rig and export it with the skinned meshes"
+
+    exporter : EnumProperty(
+        name="Format",
+        items=(
+            ('FBX', "FBX", "Export as FBX"),
+            ('GLTF', "glTF", "Export as glTF binary"),
+            ('NONE', "Armature Only", "Leave the baked deform armature in the scene"),
+        ),
+        default='FBX'
+    ) # type: ignore
+
+    actions : EnumProperty(
+        name="Actions",
+        items=(
+            ('ALL', "All", "Bake every action animating this rig"),
+            ('ACTIVE', "Active", "Bake the active action only"),
+        ),
+        default='ALL'
+    ) # type: ignore
+
+    filepath : StringProperty(subtype='FILE_PATH') # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'ARMATURE' and 'gamerig_id' in context.object.data\
+          and context.mode in ('OBJECT', 'POSE')
+
+    def invoke(self, context, event):
+        if self.exporter == 'NONE':
+            return self.execute(context)
+        if not self.filepath:
+            self.filepath = bpy.path.ensure_ext(bpy.path.abspath("//") + context.object.name, self.extension())
+        context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
-    
+
+    def extension(self):
+        return '.glb' if self.exporter == 'GLTF' else '.fbx'
+
+    def execute(self, context):
+        rig = context.object
+        if self.actions == 'ACTIVE':
+            action = rig.animation_data.action if rig.animation_data else None
+            actions = [action] if action else []
+        else:
+            actions = export.rig_actions(rig)
+        if self.exporter != 'NONE':
+            if not self.filepath:
+                self.report({'ERROR'}, "No file path.")
+                return {'CANCELLED'}
+            self.filepath = bpy.path.ensure_ext(self.filepath, self.extension())
+        try:
+            _, count, frames, seconds = export.export_rig(context, rig, actions, self.exporter, self.filepath)
+        except RuntimeError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Baked %d action(s), %d frame(s) in %.1fs." % (count, frames, seconds))
+        return {'FINISHED'}
+
+
+class DumpAnimationOperator(bpy.types.Operator):
+    """Write the deform skeleton and sampled actions as binary arrays.
+    """
+    bl_idname = "gamerig.dump_animation"
+    bl_label = "Dump Animation"
+    bl_description = "Write the deform bone hierarchy, bind poses and sampled actions as .npz or JSON header + raw .bin"
+
+    file_format : EnumProperty(
+        name="Format",
+        items=(
+            ('NPZ', "NumPy (.npz)", "Arrays and header in a NumPy archive"),
+            ('RAW', "JSON + Binary", "JSON header with a raw little-endian .bin file"),
+        ),
+        default='NPZ'
+    ) # type: ignore
+
+    actions : EnumProperty(
+        name="Actions",
+        items=(
+            ('ALL', "All", "Sample every action animating this rig"),
+            ('ACTIVE', "Active", "Sample the active action only"),
+        ),
+        default='ALL'
+    ) # type: ignore
+
+    filepath : StringProperty(subtype='FILE_PATH') # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def extension(self):
+        return '.npz' if self.file_format == 'NPZ' else '.json'
+
     def invoke(self, context, event):
-        self.ticks = 0
-        wm = context.window_manager
-        wm.gamerig.progress_indicator = 0
-        self.timer = wm.event_timer_add(1.0, window=context.window)
-        wm.modal_handler_add(self)
+        if not self.filepath:
+            self.filepath = bpy.path.ensure_ext(bpy.path.abspath("//") + context.object.name, self.extension())
+        context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
-    
-    # a variable where we can store the original draw funtion  
-    prev_draw_f = lambda s,c: None
-    
+
+    def execute(self, context):
+        rig = context.object
+        if self.actions == 'ACTIVE':
+            action = rig.animation_data.action if rig.animation_data else None
+            actions = [action] if action else []
+        else:
+            actions = export.rig_actions(rig)
+        filepath = bpy.path.ensure_ext(os.path.splitext(self.filepath)[0], self.extension())
+        frames, seconds = export.dump_rig(context, rig, actions, filepath)
+        self.report({'INFO'}, "Wrote %d action(s), %d frame(s) in %.1fs." % (len(actions), frames, seconds))
+        return {'FINISHED'}
+
+
+class CleanUpWeightsOperator(bpy.types.Operator):
+    """Prune and limit the skin weights of the meshes deformed by the rig.
+    """
+    bl_idname = "gamerig.clean_up_weights"
+    bl_label = "Clean Up Weights"
+    bl_description = "Remove non-deform bone groups, tiny weights and extra influences from the meshes deformed by this rig"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    threshold : FloatProperty(name="Threshold", description="Weights below this are removed", default=0.01, min=0.0, max=1.0) # type: ignore
+    max_influences : IntProperty(name="Max Influences", description="Bones per vertex", default=4, min=1, max=16) # type: ignore
+    normalize : BoolProperty(name="Normalize", default=True) # type: ignore
+
     @classmethod
-    def register(cls):
-        # save the original draw method of the Info header
-        cls.prev_draw_f = bpy.types.STATUSBAR_HT_header.draw
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
 
-        # create a new draw function
-        def draw(self, context):
-            # first call the original stuff
-            cls.prev_draw_f(self, context)
-            # then add the prop that acts as a progress indicator
-            wm = context.window_manager
-            progress = wm.gamerig.progress_indicator
-            if progress >= 0 and progress <= 100:
-                self.layout.separator()
-                self.layout.prop(wm.gamerig, "progress_indicator", slider=True)
+    def execute(self, context):
+        rig = context.object
+        deform_bones = {b.name for b in rig.data.bones if b.use_deform}
+        non_deform_bones = {b.name for b in rig.data.bones if not b.use_deform}
+        meshes = export.skinned_meshes(context, rig)
+        if not meshes:
+            self.report({'WARNING'}, "No mesh is deformed by '%s'." % rig.name)
+            return {'CANCELLED'}
+        start = time.perf_counter()
+        for ob in meshes:
+            stats = weights.clean_weights(ob, deform_bones, non_deform_bones, self.threshold, self.max_influences, self.normalize)
+            line = weights.describe_stats(ob.name, stats)
+            print("GameRig: " + line)
+            self.report({'INFO'}, line)
+        self.report({'INFO'}, "Cleaned up %d mesh(es) in %.2fs." % (len(meshes), time.perf_counter() - start))
+        return {'FINISHED'}
 
-        # replace it
-        bpy.types.STATUSBAR_HT_header.draw = draw
+
+class GameExportPanel(bpy.types.Panel):
+    bl_idname = "GAMERIG_PT_game_export"
+    bl_space_type  = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_label       = "GameRig Export"
+    bl_category = "Tool"
+    bl_options = {'DEFAULT_CLOSED'}
 
     @classmethod
-    def unregister(cls):
-        # recover the saved original draw method to the status bar
-        bpy.types.STATUSBAR_HT_header.draw = cls.prev_draw_f
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def draw(self, context):
+        layout = self.layout
+        col = layout.column(align=True)
+        for exporter, text in (('FBX', "Export FBX"), ('GLTF', "Export glTF"), ('NONE', "Bake Deform Armature")):
+            op = col.operator(GameExportOperator.bl_idname, text=text, icon='EXPORT')
+            op.exporter = exporter
+        col.operator(DumpAnimationOperator.bl_idname, icon='FILE')
+        layout.operator(CleanUpWeightsOperator.bl_idname, icon='MOD_VERTEX_WEIGHT')
+
+
+class RootMotionOperator(bpy.types.Operator):
+    """Move the ground motion of the torso onto the root control.
+    """
+    bl_idname = "gamerig.root_motion"
+    bl_label = "Extract Root Motion"
+    bl_description = "Project the torso pivot motion on the ground onto the root control, compensating the controls under the root"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    root : StringProperty(name="Root", description="Root control bone (empty : the top level control)") # type: ignore
+    pivot : StringProperty(name="Pivot", description="Torso pivot or hips bone", default="c.torso") # type: ignore
+
+    up_axis : EnumProperty(
+        name="Up",
+        items=(('Z', "Z", "Z up"), ('Y', "Y", "Y up")),
+        default='Z'
+    ) # type: ignore
+
+    location_axes : EnumProperty(
+        name="Location",
+        items=(('X', "X", ""), ('Y', "Y", ""), ('Z', "Z", "")),
+        options={'ENUM_FLAG'},
+        default={'X', 'Y'}
+    ) # type: ignore
+
+    use_rotation : BoolProperty(name="Rotation", description="Transfer the pivot heading to the root", default=True) # type: ignore
+
+    forward_axis : EnumProperty(
+        name="Forward",
+        description="Local axis of the pivot bone pointing forward",
+        items=(('X', "X", ""), ('-X', "-X", ""), ('Y', "Y", ""), ('-Y', "-Y", ""), ('Z', "Z", ""), ('-Z', "-Z", "")),
+        default='Z'
+    ) # type: ignore
+
+    smoothing : IntProperty(name="Smoothing", description="Moving average window in frames", default=1, min=1, max=99) # type: ignore
+
+    actions : EnumProperty(
+        name="Actions",
+        items=(
+            ('ACTIVE', "Active", "Active action only"),
+            ('ALL', "All", "Every action animating this rig"),
+        ),
+        default='ACTIVE'
+    ) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def draw(self, context):
+        layout = self.layout
+        rig = context.object
+        layout.prop_search(self, "root", rig.data, "bones")
+        layout.prop_search(self, "pivot", rig.data, "bones")
+        layout.prop(self, "up_axis", expand=True)
+        layout.prop(self, "location_axes", expand=True)
+        row = layout.row()
+        row.prop(self, "use_rotation")
+        sub = row.row()
+        sub.active = self.use_rotation
+        sub.prop(self, "forward_axis", text="")
+        layout.prop(self, "smoothing")
+        layout.prop(self, "actions", expand=True)
+
+    def execute(self, context):
+        rig = context.object
+        root = self.root or animation.find_root_control(rig)
+        if root not in rig.pose.bones or self.pivot not in rig.pose.bones:
+            self.report({'ERROR'}, "Root or pivot bone not found.")
+            return {'CANCELLED'}
+        rig.animation_data_create()
+        action_backup = rig.animation_data.action
+        if self.actions == 'ACTIVE':
+            actions = [action_backup] if action_backup else []
+        else:
+            actions = export.rig_actions(rig)
+        if not actions:
+            self.report({'WARNING'}, "No action.")
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        frame_backup = context.scene.frame_current
+        frames = 0
+        try:
+            for action in actions:
+                frames += animation.extract_root_motion(
+                    context, rig, action, root, self.pivot, self.up_axis, self.location_axes,
+                    self.use_rotation, self.forward_axis, self.smoothing
+                )
+        finally:
+            rig.animation_data.action = action_backup
+            context.scene.frame_set(frame_backup)
+        self.report({'INFO'}, "Extracted root motion of %d action(s), %d frame(s) in %.2fs." % (len(actions), frames, time.perf_counter() - start))
+        return {'FINISHED'}
+
+
+def scoped_actions(context, scope):
+    """ (actions, bone names or None) of an animation tool scope : 'ACTION', 'SELECTED' or 'ALL'.
+    """
+    rig = context.object
+    action = rig.animation_data.action if rig.animation_data else None
+    if scope == 'ALL':
+        return export.rig_actions(rig), None
+    if scope == 'SELECTED':
+        return ([action] if action else []), {pb.name for pb in context.selected_pose_bones or ()}
+    return ([action] if action else []), None
+
+
+ANIMATION_SCOPES = (
+    ('ACTION', "Current Action", "Every bone of the current action"),
+    ('SELECTED', "Selected Bones", "Selected bones of the current action"),
+    ('ALL', "All Actions", "Every action animating this rig"),
+)
+
+
+class ReduceKeysOperator(bpy.types.Operator):
+    """Remove the keys that linear interpolation reproduces within the tolerances.
+    """
+    bl_idname = "gamerig.reduce_keys"
+    bl_label = "Reduce Keys"
+    bl_description = "Simplify baked bone curves, keeping the keys needed to stay within the tolerances"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope : EnumProperty(name="Scope", items=ANIMATION_SCOPES, default='ACTION') # type: ignore
+    location_tolerance : FloatProperty(name="Location", default=0.001, min=0.0, precision=4, subtype='DISTANCE') # type: ignore
+    rotation_tolerance : FloatProperty(name="Rotation", default=math.radians(0.1), min=0.0, precision=3, subtype='ANGLE') # type: ignore
+    scale_tolerance : FloatProperty(name="Scale", default=0.001, min=0.0, precision=4) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def execute(self, context):
+        actions, bones = scoped_actions(context, self.scope)
+        if not actions:
+            self.report({'WARNING'}, "No action.")
+            return {'CANCELLED'}
+        tolerances = { 'LOCATION' : self.location_tolerance, 'ROTATION' : self.rotation_tolerance, 'SCALE' : self.scale_tolerance }
+        before = after = 0
+        max_error = 0.0
+        for action in actions:
+            b, a, e = animation.reduce_keys(action, tolerances, bones)
+            before += b
+            after += a
+            max_error = max(max_error, e)
+        self.report({'INFO'}, "Keys %d -> %d (%.1f%%), max error %.5f." % (
+            before, after, 100.0 * after / before if before else 100.0, max_error
+        ))
+        return {'FINISHED'}
+
+
+class FixQuaternionFlipsOperator(bpy.types.Operator):
+    """Keep consecutive quaternion keys on the same hemisphere.
+    """
+    bl_idname = "gamerig.fix_quaternion_flips"
+    bl_label = "Fix Quaternion Flips"
+    bl_description = "Flip the sign of quaternion keys jumping to the opposite hemisphere, so interpolation doesn't spin"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope : EnumProperty(name="Scope", items=ANIMATION_SCOPES, default='ACTION') # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def execute(self, context):
+        actions, bones = scoped_actions(context, self.scope)
+        flipped = sum(animation.fix_quaternion_continuity(action, bones) for action in actions)
+        self.report({'INFO'}, "Flipped %d key(s) in %d action(s)." % (flipped, len(actions)))
+        return {'FINISHED'}
+
+
+class MirrorActionOperator(bpy.types.Operator):
+    """Create mirrored copies of actions, swapping the left and right bones.
+    """
+    bl_idname = "gamerig.mirror_action"
+    bl_label = "Mirror Action"
+    bl_description = "Create a new action mirrored on the X axis, swapping the animation of left and right bones"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    actions : EnumProperty(
+        name="Actions",
+        items=(
+            ('ACTIVE', "Active", "Mirror the active action"),
+            ('ALL', "All", "Mirror every action animating this rig"),
+        ),
+        default='ACTIVE'
+    ) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def execute(self, context):
+        rig = context.object
+        actions, _ = scoped_actions(context, 'ALL' if self.actions == 'ALL' else 'ACTION')
+        if not actions:
+            self.report({'WARNING'}, "No action.")
+            return {'CANCELLED'}
+        start = time.perf_counter()
+        mirrored = [animation.mirror_action(rig, action) for action in actions]
+        if self.actions == 'ACTIVE':
+            rig.animation_data.action = mirrored[0]
+        self.report({'INFO'}, "Mirrored %d action(s) in %.2fs." % (len(mirrored), time.perf_counter() - start))
+        return {'FINISHED'}
+
+
+class AnimationToolsPanel(bpy.types.Panel):
+    bl_idname = "GAMERIG_PT_animation_tools"
+    bl_space_type  = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_label       = "GameRig Animation"
+    bl_category = "Tool"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        return GameExportOperator.poll(context)
+
+    def draw(self, context):
+        layout = self.layout
+        col = layout.column(align=True)
+        for actions, text in (('ACTIVE', "Root Motion"), ('ALL', "Root Motion (All Actions)")):
+            op = col.operator(RootMotionOperator.bl_idname, text=text, icon='ANCHOR_CENTER')
+            op.actions = actions
+        col = layout.column(align=True)
+        for scope, text in (('ACTION', "Reduce Keys"), ('SELECTED', "Reduce Keys (Selected)"), ('ALL', "Reduce Keys (All Actions)")):
+            op = col.operator(ReduceKeysOperator.bl_idname, text=text, icon='IPO_LINEAR')
+            op.scope = scope
+        col = layout.column(align=True)
+        for scope, text in (('ACTION', "Fix Quaternion Flips"), ('SELECTED', "Fix Quaternion Flips (Selected)"), ('ALL', "Fix Quaternion Flips (All Actions)")):
+            op = col.operator(FixQuaternionFlipsOperator.bl_idname, text=text, icon='ORIENTATION_GIMBAL')
+            op.scope = scope
+        col = layout.column(align=True)
+        for actions, text in (('ACTIVE', "Mirror Action"), ('ALL', "Mirror All Actions")):
+            op = col.operator(MirrorActionOperator.bl_idname, text=text, icon='MOD_MIRROR')
+            op.actions = actions
+
+
+def lod_armature(obj):
+    """ The LOD armature deforming a mesh object, or None.
+    """
+    for m in obj.modifiers:
+        if m.type == 'ARMATURE' and m.object and m.object.type == 'ARMATURE' and lod.LOD_REMAP_PROP in m.object.data:
+            return m.object
+    return None
+
+
+class MergeLODWeightsOperator(bpy.types.Operator):
+    """Merge the vertex groups of the bones removed in the LOD into their surviving bones.
+    """
+    bl_idname = "gamerig.merge_lod_weights"
+    bl_label = "Merge LOD Weights"
+    bl_description = "Merge the weights of the bones missing in the LOD armature of this mesh into their surviving ancestors"
+    bl_options = {'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'MESH' and context.mode == 'OBJECT' and lod_armature(context.object)
+
+    def execute(self, context):
+        obj = context.object
+        count = weights.merge_weights(obj, lod.lod_remap(lod_armature(obj)))
+        self.report({'INFO'}, "Merged %d vertex group(s)." % count)
+        return {'FINISHED'}
+
+
+class LODWeightsPanel(bpy.types.Panel):
+    bl_idname = "GAMERIG_PT_lod_weights"
+    bl_space_type  = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context     = "data"
+    bl_label       = "GameRig LOD"
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'MESH' and lod_armature(context.object)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Deformed by '%s'" % lod_armature(context.object).name, icon='ARMATURE_DATA')
+        layout.operator(MergeLODWeightsOperator.bl_idname)
 
 
 class GenerateOperator(bpy.types.Operator):
@@ -569,6 +1062,8 @@ class GenerateOperator(bpy.types.Operator):
     bl_description = 'Generates a rig from the active metarig armature'
     bl_options     = {'UNDO'}
 
+    time_slice = 0.1 # Seconds of generation work per modal step
+
     @classmethod
     def poll(cls, context):
         return context.object in context.visible_objects
@@ -583,23 +1078,105 @@ class GenerateOperator(bpy.types.Operator):
             error = generate.generate_rig(context, context.object)
             if error:
                 self.report({'ERROR'}, error)
-                try:
-                    bpy.ops.ed.undo()
-                except RuntimeError:
-                    pass
                 return {'CANCELLED'}
         except Exception as e:
             self.report({'ERROR'}, f"GAMERIG ERROR: {e}")
-            try:
-                bpy.ops.ed.undo()
-            except RuntimeError:
-                pass
             return {'CANCELLED'}
         finally:
             context.preferences.edit.use_global_undo = use_global_undo
         
+        self.report_summary()
         return { 'FINISHED' }
 
+    def invoke(self, context, event):
+        import importlib
+        importlib.reload(generate)
+
+        self.use_global_undo = context.preferences.edit.use_global_undo
+        context.preferences.edit.use_global_undo = False
+        self.steps = generate.generate_rig_steps(context, context.object)
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.steps.close()
+            self.report({'WARNING'}, "Rig generation cancelled.")
+            return self.finish(context, True)
+
+        if event.type != 'TIMER':
+            return {'RUNNING_MODAL'} # block other input while generating
+
+        deadline = time.time() + self.time_slice
+        try:
+            while time.time() < deadline:
+                generate.resume(self.steps, context)
+        except StopIteration as e:
+            if e.value:
+                self.report({'ERROR'}, e.value)
+                return self.finish(context, True)
+            return self.finish(context, False)
+        except Exception as e:
+            self.report({'ERROR'}, f"GAMERIG ERROR: {e}")
+            return self.finish(context, True)
+
+        for area in context.screen.areas:
+            if area.type == 'STATUSBAR':
+                area.tag_redraw()
+        return {'RUNNING_MODAL'}
+
+    def finish(self, context, failed):
+        # A failed or cancelled generation has already discarded its scratch rig
+        context.window_manager.event_timer_remove(self.timer)
+        context.preferences.edit.use_global_undo = self.use_global_undo
+        if failed:
+            return {'CANCELLED'}
+        self.report_summary()
+        return {'FINISHED'}
+
+    def report_summary(self):
+        """ Generation report (warnings, optimizer and driver statistics).
+        """
+        for line in generate.report:
+            self.report({'WARNING'}, line)
+        for summary in (optimizer.summary(), generate.folded_summary()):
+            if summary:
+                self.report({'INFO'}, summary)
+
+    # a variable where we can store the original draw funtion  
+    prev_draw_f = lambda s,c: None
+    
+    @classmethod
+    def register(cls):
+        # save the original draw method of the Info header
+        cls.prev_draw_f = bpy.types.STATUSBAR_HT_header.draw
+
+        # create a new draw function
+        def draw(self, context):
+            # first call the original stuff
+            cls.prev_draw_f(self, context)
+            # then add the prop that acts as a progress indicator
+            wm = context.window_manager
+            progress = wm.gamerig.progress_indicator
+            if progress >= 0 and progress <= 100:
+                self.layout.separator()
+                self.layout.prop(wm.gamerig, "progress_indicator", slider=True)
+                eta = estimate_remaining_time()
+                if eta is not None:
+                    self.layout.label(text="ETA %.1fs (Esc to cancel)" % eta)
+                else:
+                    self.layout.label(text="Esc to cancel")
+
+        # replace it
+        bpy.types.STATUSBAR_HT_header.draw = draw
+
+    @classmethod
+    def unregister(cls):
+        # recover the saved original draw method to the status bar
+        bpy.types.STATUSBAR_HT_header.draw = cls.prev_draw_f
+
 
 class ToggleArmatureReferenceOperator(bpy.types.Operator):
     """Toggle armature reference between metarig and generated rig."""
@@ -850,6 +1427,7 @@ class MigrateOperator(bpy.types.Operator):
         #     armature.gamerig.theme_to_add = armature['gamerig_theme_to_add']
         #     del armature['gamerig_theme_to_add']
 
+        unknown = []
         for pb in context.object.pose.bones:
             if 'gamerig_type' in pb:
                 pb.gamerig.name = pb['gamerig_type']
@@ -861,6 +1439,20 @@ class MigrateOperator(bpy.types.Operator):
             if 'gamerig_parameters' in pb:
                 del pb['gamerig_parameters']
 
+            # Move rig parameters into the per rig type parameter group.
+            # They are kept where they are while the rig type is unknown.
+            params = pb.gamerig.params
+            keys = legacy_parameter_keys(pb)
+            if keys and params is None:
+                unknown.append(pb.name)
+                continue
+            for k in keys:
+                v = pb.gamerig[k]
+                params[k] = v.to_list() if hasattr(v, 'to_list') else v.to_dict() if hasattr(v, 'to_dict') else v
+                del pb.gamerig[k]
+
+        if unknown:
+            self.report({'WARNING'}, "Parameters not migrated, unknown rig type: " + ", ".join(unknown))
         return {'FINISHED'}
 
 
@@ -1063,6 +1655,10 @@ class Q2ECurrentActionOperator(bpy.types.Operator):
         else:
             convert.one_act_every_bone(obj, action, param.q2e_order_list)
 
+        if param.q2e_order_list == 'QUATERNION':
+            animation.fix_quaternion_continuity(action, {b.name for b in pose_bones} if param.q2e_convert_only_selected else None)
+        pose_cache.invalidate(action)
+
         return {'FINISHED'}
 
 
@@ -1087,6 +1683,13 @@ class Q2EAllActionsOperator(bpy.types.Operator):
         else:
             convert.all_act_every_bone(obj, param.q2e_order_list)
 
+        if param.q2e_order_list == 'QUATERNION':
+            bones = {b.name for b in pose_bones} if param.q2e_convert_only_selected else None
+            for action in bpy.data.actions:
+                animation.fix_quaternion_continuity(action, bones)
+        for action in bpy.data.actions:
+            pose_cache.invalidate(action)
+
         return {'FINISHED'}
 
 
@@ -1129,7 +1732,15 @@ register, unregister = bpy.utils.register_classes_factory((
     RemoveBoneGroupOperator,
     RemoveAllBoneGroupOperator,
     RevealUnlinkedWidgetOperator,
-    # GenerateProgressOperator,
+    ProfileRigOperator,
+    GameExportOperator,
+    MergeLODWeightsOperator,
+    DumpAnimationOperator,
+    CleanUpWeightsOperator,
+    RootMotionOperator,
+    ReduceKeysOperator,
+    FixQuaternionFlipsOperator,
+    MirrorActionOperator,
     GenerateOperator,
     ToggleArmatureReferenceOperator,
     EncodeMetarigOperator,
@@ -1145,6 +1756,10 @@ register, unregister = bpy.utils.register_classes_factory((
     BonePanel,
     UtilityPanel,
     DevToolsPanel,
+    ProfilePanel,
+    GameExportPanel,
+    AnimationToolsPanel,
+    LODWeightsPanel,
     RenameBatchPanel,
     Q2EPanel,
 ))
@@ -23,7 +23,7 @@ import importlib
 import random
 import string
 import re
-from mathutils import Vector, Color
+from mathutils import Vector, Color, Matrix
 from rna_prop_ui import rna_idprop_ui_create
 
 RIG_DIR = "rigs"  # Name of the directory where rig types are kept
@@ -155,19 +155,50 @@ def insert_before_first_period(name, text):
 #=======================
 
 progress = [0, 0]
+progress_steps = []    # keys of the steps not done yet
+progress_timings = {}  # {step key: seconds} recorded by previous generations
 
-def begin_progress(max):
-    progress = (0, max)
-    bpy.context.window_manager.progress_begin(progress[0], progress[1])
+def begin_progress(steps):
+    """ Start progress over a list of step keys.
+    """
+    progress[0] = 0
+    progress[1] = len(steps)
+    progress_steps[:] = steps
+    bpy.context.window_manager.progress_begin(0, progress[1])
     bpy.context.window_manager.gamerig.progress_indicator = 0
 
-def update_progress():
+def update_progress(step=None, seconds=None):
+    """ Mark a step done, recording how long it took for later estimates.
+    """
     progress[0] += 1
+    if step is not None:
+        if seconds is not None:
+            progress_timings[step] = seconds
+        if step in progress_steps:
+            progress_steps.remove(step)
     bpy.context.window_manager.progress_update(progress[0])
     if progress[1] > 0:
         bpy.context.window_manager.gamerig.progress_indicator = progress[0] / progress[1] * 100
 
+def skip_progress(step):
+    """ Drop a step which will not run.
+    """
+    if step in progress_steps:
+        progress_steps.remove(step)
+        progress[1] -= 1
+
+def estimate_remaining_time():
+    """ Seconds left for the remaining steps, from previously recorded timings.
+        Unknown steps count as the average of known ones. None if nothing is known.
+    """
+    known = [progress_timings[i] for i in progress_steps if i in progress_timings]
+    if not known:
+        return None
+    average = sum(known) / len(known)
+    return sum(progress_timings.get(i, average) for i in progress_steps)
+
 def end_progress():
+    progress_steps.clear()
     bpy.context.window_manager.progress_end()
     bpy.context.window_manager.gamerig.progress_indicator = -1
 
@@ -301,6 +332,16 @@ def move_bone_collection_to(obj, bone_name, collection_name):
         obj.data.collections[collection_name].assign(bone)
 
 
+def generation_matrix(obj):
+    """ World matrix of a rig being generated, without the object rotation.
+        Rigs are generated with the bones already in world orientation (the
+        bone data is rotated, not the object, see generate.py), so the
+        rotation of matrix_world must not be applied to bone axes again.
+    """
+    loc, _, scale = obj.matrix_world.decompose()
+    return Matrix.LocRotScale(loc, None, scale)
+
+
 #=============================================
 # Widget creation
 #=============================================
@@ -433,6 +474,66 @@ def bone_prop_link_driver(obj, bone_name, org_bone_name):
                 pass
 
 
+def driver_base_expression(drv):
+    """ Simple expression computing the value of a driver, or None if it can't be written as one.
+    """
+    names = [v.name for v in drv.variables]
+    if not all(n.isidentifier() for n in names):
+        return None
+    if drv.type == 'SCRIPTED':
+        return None if drv.use_self else "(%s)" % drv.expression
+    if not names:
+        return "0"
+    if drv.type == 'AVERAGE':
+        return names[0] if len(names) == 1 else "(%s) / %d" % (" + ".join(names), len(names))
+    if drv.type == 'SUM':
+        return names[0] if len(names) == 1 else "(%s)" % " + ".join(names)
+    if drv.type in {'MIN', 'MAX'}:
+        return "%s(%s)" % (drv.type.lower(), ", ".join(names))
+    return None
+
+
+def linear_expression(c0, c1, base):
+    """ Simple expression of c0 + c1 * base.
+        Numbers are written with repr() so that the expression evaluates
+        to exactly the value of the folded modifiers.
+    """
+    if c1 == 0.0:
+        return repr(float(c0))
+    scaled = base if abs(c1) == 1.0 else "%r * %s" % (abs(float(c1)), base)
+    if c0 == 0.0:
+        return scaled if c1 > 0.0 else "-" + scaled
+    return "%r %s %s" % (float(c0), "+" if c1 > 0.0 else "-", scaled)
+
+
+def fold_driver_modifiers(fcurve):
+    """ Fold the linear generator modifiers of a driver F-Curve (e.g. the 1 - x
+        of switches) into the driver as a simple expression, which Blender
+        evaluates without Python nor F-Modifier.
+        Returns the number of modifiers removed.
+    """
+    if len(fcurve.modifiers) == 0 or len(fcurve.keyframe_points) > 0:
+        return 0
+    c0, c1 = 0.0, 1.0
+    for m in fcurve.modifiers:
+        if m.mute:
+            continue
+        if m.type != 'GENERATOR' or m.mode != 'POLYNOMIAL' or m.poly_order != 1\
+           or m.use_additive or m.use_restricted_range or m.use_influence:
+            return 0
+        c0, c1 = m.coefficients[0] + m.coefficients[1] * c0, m.coefficients[1] * c1
+    if (c0, c1) != (0.0, 1.0):
+        base = driver_base_expression(fcurve.driver)
+        if base is None:
+            return 0
+        fcurve.driver.type = 'SCRIPTED'
+        fcurve.driver.expression = linear_expression(c0, c1, base)
+    count = len(fcurve.modifiers)
+    for m in list(fcurve.modifiers):
+        fcurve.modifiers.remove(m)
+    return count
+
+
 def bone_props_ui_string(obj, bone_name, org_bone_name):
     org_bone = obj.pose.bones[org_bone_name]
     rna_properties = {prop.identifier for prop in org_bone.bl_rna.properties if prop.is_runtime}
@@ -471,11 +572,48 @@ def rig_module_name(rig_type):
     return ".%s.%s" % (RIG_DIR, rig_type)
 
 
+def rig_parameter_group_name(rig_type):
+    """ return the name of the nested parameter group for a rig type.
+    """
+    return "params_" + rig_type.replace(".", "_")
+
+
+def legacy_parameter_keys(pbone):
+    """ Returns the rig parameters stored by older versions directly in
+        pbone.gamerig instead of the nested per rig type group.
+        Properties registered on the group (name, LOD settings, ...) are not parameters.
+    """
+    registered = { prop.identifier for prop in pbone.gamerig.bl_rna.properties }
+    return [
+        key for key in pbone.gamerig.keys()
+        if key not in registered and not key.startswith("params_")
+    ]
+
+
 def get_rig_type(rig_type):
     """ Fetches a rig module by name, and returns it.
     """
     submod = importlib.import_module(rig_module_name(rig_type), package=MODULE_NAME)
     importlib.reload(submod)
+    _rig_type_cache[rig_type] = submod
+    return submod
+
+
+_rig_type_cache = {}
+
+def find_rig_type(rig_type):
+    """ Fetches a rig module by name like get_rig_type, but without reloading.
+        Modules (and missing ones) are cached, so this is cheap enough for
+        UI draw and property update callbacks.
+    """
+    if rig_type not in _rig_type_cache:
+        try:
+            _rig_type_cache[rig_type] = importlib.import_module(rig_module_name(rig_type), package=MODULE_NAME)
+        except ImportError:
+            _rig_type_cache[rig_type] = None
+    submod = _rig_type_cache[rig_type]
+    if submod is None:
+        raise ImportError("rig type '%s' not found" % rig_type)
     return submod
 
 
@@ -648,14 +786,19 @@ def write_metarig(obj, func_name="create", metarig=False):
                 code.append(f"    arm.collections['{col.name}'].assign(pbone)")
         # Rig type parameters
         if pbone.gamerig.name:
-            for i in pbone.gamerig.keys():
-                param = getattr(pbone.gamerig, i, '')
+            code.append("    try:")
+            code.append("        pbone.gamerig.name = \"%s\"" % pbone.gamerig.name)
+            code.append("    except AttributeError:")
+            code.append("        pass")
+            params = pbone.gamerig.params
+            for i in (params.keys() if params else []):
+                param = getattr(params, i, '')
                 if str(type(param)) == "<class 'bpy_prop_array'>":
                     param = list(param)
                 if type(param) == str:
                     param = '"' + param + '"'
                 code.append("    try:")
-                code.append("        pbone.gamerig.%s = %s" % (i, str(param)))
+                code.append("        pbone.gamerig.params.%s = %s" % (i, str(param)))
                 code.append("    except AttributeError:")
                 code.append("        pass")
 
@@ -0,0 +1,159 @@
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# <pep8 compliant>
+
+""" Vertex group weight tools working on NumPy arrays.
+
+    Weights are read once into sparse (vertex, group, weight) entry arrays
+    (merge_weights expands them to a dense vertices x groups array), processed
+    vectorized and written back one call per distinct weight and group
+    (see write_group).
+    Blender has no bulk (foreach_get) access to vertex group weights, so
+    read_entries loops over the vertices in Python : it is the known
+    bottleneck of these tools on dense meshes.
+"""
+
+import numpy as np
+
+
+def read_entries(obj):
+    """ All the vertex group weights of a mesh object as (vertex indices, group indices, weights) arrays.
+        One Python iteration per vertex and weight, see the module docstring.
+    """
+    entries = [(v.index, g.group, g.weight) for v in obj.data.vertices for g in v.groups]
+    if not entries:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    a = np.array(entries, dtype=np.float64)
+    return a[:, 0].astype(np.int64), a[:, 1].astype(np.int64), a[:, 2].astype(np.float32)
+
+
+def read_weights(obj):
+    """ (vertices, vertex groups) array of the weights of a mesh object.
+    """
+    weights = np.zeros((len(obj.data.vertices), len(obj.vertex_groups)), dtype=np.float32)
+    vi, gi, w = read_entries(obj)
+    weights[vi, gi] = w
+    return weights
+
+
+def write_group(vertex_group, indices, values, previous=None):
+    """ Set the weights of a vertex group. previous : vertices to remove from the group first.
+        Vertices sharing a weight are added by one call. That only saves
+        calls where weights repeat, such as painted flat weights. Weights
+        are not quantized, so after renormalization it is close to one
+        add() per vertex.
+    """
+    if previous is not None and len(previous):
+        vertex_group.remove(previous.tolist())
+    for weight in np.unique(values):
+        vertex_group.add(indices[values == weight].tolist(), float(weight), 'REPLACE')
+
+
+def write_weights(vertex_group, column):
+    """ Replace the weights of a vertex group by an array column. Zero weights are removed.
+    """
+    indices = np.flatnonzero(column)
+    write_group(vertex_group, indices, column[indices], np.arange(len(column)))
+
+
+def merge_weights(obj, remap):
+    """ Add the weights of the vertex groups of removed bones to their surviving bones and remove them.
+        remap : {removed bone: surviving bone or None}. Groups without a survivor are left as they are.
+        Returns the number of merged vertex groups.
+    """
+    remap = { k : v for k, v in remap.items() if v and k in obj.vertex_groups }
+    if not remap:
+        return 0
+    for target in set(remap.values()):
+        if target not in obj.vertex_groups:
+            obj.vertex_groups.new(name=target)
+
+    weights = read_weights(obj)
+    index = { vg.name : vg.index for vg in obj.vertex_groups }
+    for removed, target in remap.items():
+        weights[:, index[target]] += weights[:, index[removed]]
+    np.minimum(weights, 1.0, out=weights)
+
+    for target in set(remap.values()):
+        write_weights(obj.vertex_groups[target], weights[:, index[target]])
+    for removed in remap:
+        obj.vertex_groups.remove(obj.vertex_groups[removed])
+    return len(remap)
+
+
+def influence_stats(vi, vertex_count):
+    counts = np.bincount(vi, minlength=vertex_count) if vertex_count else np.zeros(1, dtype=np.int64)
+    return { 'mean' : float(counts.mean()), 'max' : int(counts.max()) }
+
+
+def clean_weights(obj, deform_bones, non_deform_bones, threshold=0.01, max_influences=4, normalize=True):
+    """ Game engine friendly skin weights :
+        - remove the vertex groups of non-deform bones,
+        - prune the weights below threshold (the largest one of a vertex is always kept),
+        - keep the max_influences largest weights per vertex,
+        - renormalize the deform bone weights of each vertex (vertices
+          whose kept weights are all zero are left at zero).
+        Vertex groups not named after a bone are left as they are.
+        Returns statistics of the mesh.
+    """
+    vertex_count = len(obj.data.vertices)
+    names = [vg.name for vg in obj.vertex_groups]
+    vi, gi, w = read_entries(obj)
+
+    is_deform = np.array([n in deform_bones for n in names] + [False], dtype=bool)
+    bone = is_deform[gi]
+    vi, gi, w = vi[bone], gi[bone], w[bone]
+    before = influence_stats(vi, vertex_count)
+
+    # Sort by vertex, largest weight first, and rank the weights of each vertex
+    order = np.lexsort((-w, vi))
+    vi, gi, w = vi[order], gi[order], w[order]
+    rank = np.arange(len(vi)) - np.searchsorted(vi, vi, side='left')
+    keep = (rank < max_influences) & ((w >= threshold) | (rank == 0))
+
+    nvi, ngi, nw = vi[keep], gi[keep], w[keep]
+    if normalize and len(nw):
+        sums = np.bincount(nvi, weights=nw, minlength=vertex_count)[nvi]
+        nw = np.divide(nw, sums, out=nw.astype(np.float64), where=sums > 0).astype(np.float32)
+
+    changed = set(np.unique(gi[~keep]).tolist())
+    changed.update(np.unique(ngi[np.abs(nw - w[keep]) > 1e-6]).tolist())
+    for g in changed:
+        sel = ngi == g
+        write_group(obj.vertex_groups[names[g]], nvi[sel], nw[sel], vi[gi == g])
+
+    removed = [n for n in names if n in non_deform_bones]
+    for name in removed:
+        obj.vertex_groups.remove(obj.vertex_groups[name])
+
+    after = influence_stats(nvi, vertex_count)
+    return {
+        'vertices' : vertex_count,
+        'before'   : before,
+        'after'    : after,
+        'pruned'   : int((~keep).sum()),
+        'removed_groups' : len(removed),
+    }
+
+
+def describe_stats(name, stats):
+    return "%s: %d vertices, influences avg %.2f -> %.2f, max %d -> %d, %d weight(s) pruned, %d group(s) removed" % (
+        name, stats['vertices'], stats['before']['mean'], stats['after']['mean'],
+        stats['before']['max'], stats['after']['max'], stats['pruned'], stats['removed_groups']
+    )